@@ -1,32 +1,76 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, g, request, jsonify, session
 import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_cors import CORS
 from openai import OpenAI
 import PyPDF2
+import openpyxl
 import pandas as pd
 import os
+import atexit
+import json
 import re
+import time
+from concurrent.futures import as_completed
+from datetime import datetime, timezone
 import spacy
+import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 from werkzeug.utils import secure_filename
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from batching import MicroBatcher
+from db_pool import ConnectionPool
+from log_writer import BatchedLogWriter
+from rule_engine import RuleEngine, redact_spans, validate_rule
+from result_cache import ResultCache, content_key, file_key
+from tabular_scan import TabularScanner
+from stream_filter import StreamRedactor
+from student_model import StudentClassifier
+from stub_model import StubClassifier
+from model_registry import ModelRegistry
+from live_feed import LiveFeed
+from metrics import MetricsRegistry
+from token_inference import TokenAwareClassifier
+from model_metrics import (PREDICTION_MODELS, CONFUSION_CELLS, backfill_sql, confusion_counts_sql,
+                           confusion_table_sql, confusion_trigger_sql, metrics_from_counts, rebuild_confusion)
+from usage_stats import EndpointUsageAggregator, BUCKET_COLUMNS, rollup_table_sql
 
 # Initializes the Flask app
 app = Flask(__name__)
 app.secret_key = "supersecretkey" # Secret key for session management
 
-# Initializes OpenAI client with Api Key
-client = OpenAI(api_key="")
+# Initializes OpenAI client with Api Key (OPENAI_BASE_URL can point at a local stub for testing)
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
+client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
 
 # Enables CORS to allow cross-origin requests
 CORS(app, supports_credentials=True)
 
+# Pooled SQLite connections (WAL, tuned pragmas, prepared statement cache); conn.close() returns them to the pool
+DB_PATH = os.environ.get("DB_PATH", "users.db")
+db_pool = ConnectionPool(DB_PATH, size=int(os.environ.get("DB_POOL_SIZE", "16")),
+                         busy_timeout=float(os.environ.get("DB_BUSY_TIMEOUT", "5")),
+                         cache_size_kb=int(os.environ.get("DB_CACHE_SIZE_KB", "16000")),
+                         mmap_size=int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024))))
+# Closing the connections checkpoints the WAL; registered first so it runs after the log writer's final flush
+atexit.register(db_pool.close_all)
+
+# Score above which a model's LABEL_1 prediction counts as sensitive (also used by the model_confusion counters)
+SENSITIVE_THRESHOLD = 0.7
+
 def get_db_connection():
-    # Connects to SQLite database
-    conn = sqlite3.connect("users.db")
-    conn.row_factory = sqlite3.Row # So we can access columns by name
-    return conn
+    # Borrows a connection to the SQLite database from the pool
+    return db_pool.acquire()
+
+def add_column_if_missing(cursor, table, column, definition):
+    # SQLite has no ADD COLUMN IF NOT EXISTS, so checks the table schema first
+    cursor.execute(f"PRAGMA table_info({table})")
+    # Returns True when the column was added, so callers can backfill it once
+    if column not in [row["name"] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
 
 def init_db():
     # Initialize database tables if they don't exist
@@ -55,6 +99,9 @@ def init_db():
                         id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint TEXT,
                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
 
+    # Per-minute endpoint usage (request count, latency totals and histogram), written by the usage aggregator
+    cursor.execute(rollup_table_sql())
+
     # Logs sensitive data detections
     cursor.execute('''CREATE TABLE IF NOT EXISTS sensitive_data_logs (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -67,16 +114,461 @@ def init_db():
                         is_sensitive INTEGER,
                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE)''')
+
+    # Migrations for columns added after the first release
+    add_column_if_missing(cursor, "sensitive_data_logs", "skipped_stages", "TEXT")
+    add_column_if_missing(cursor, "sensitive_data_logs", "stage_timings", "TEXT")
+
+    # Index backing the keyset-paginated /history (newest first by id); /sensitive_logs pages on the primary key
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history (user_id, id)")
+    # No query filters detection logs by user, so this index only slowed down every insert
+    cursor.execute("DROP INDEX IF EXISTS idx_sensitive_data_logs_user_id")
+
+    # Structured model predictions (label 1/0 and score, NULL when skipped), parsed once from the legacy strings
+    for model in PREDICTION_MODELS:
+        added = add_column_if_missing(cursor, "sensitive_data_logs", f"{model}_label", "INTEGER")
+        add_column_if_missing(cursor, "sensitive_data_logs", f"{model}_score", "REAL")
+        if added:
+            cursor.execute(backfill_sql(model))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sensitive_data_logs_timestamp ON sensitive_data_logs (timestamp)")
+
+    # Running confusion matrix per model, updated by a trigger as detection logs are inserted
+    cursor.execute(confusion_table_sql())
+    cursor.execute(confusion_trigger_sql())
+    cursor.execute("SELECT COUNT(*) FROM model_confusion WHERE threshold = ?", (SENSITIVE_THRESHOLD,))
+    if cursor.fetchone()[0] != len(PREDICTION_MODELS):
+        rebuild_confusion(cursor, SENSITIVE_THRESHOLD)
     conn.commit()
     conn.close()
 
 init_db() # Creates tables when app starts
 
-# Load sNLP models for detecting sensitive data
-nlp = spacy.load("en_core_web_sm")
-bert_classifier = pipeline("text-classification", model="./bert_finetuned", tokenizer="./bert_finetuned")
-finbert_classifier = pipeline("text-classification", model="./finbert_finetuned", tokenizer="./finbert_finetuned")
-zero_shot_classifier = pipeline("text-classification", model="./zero_shot_finetuned", tokenizer="./zero_shot_finetuned")
+# Prometheus metrics served on /metrics: per-stage latency histograms, detection counters and queue depths.
+# With METRICS_ENABLED=0 every metric is a shared no-op; METRICS_LOG_TIMINGS=1 also stores the stage
+# timings of each detection in sensitive_data_logs.stage_timings (JSON, milliseconds)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_LOG_TIMINGS = METRICS_ENABLED and os.environ.get("METRICS_LOG_TIMINGS", "0") == "1"
+metrics_registry = MetricsRegistry(METRICS_ENABLED)
+stage_seconds = metrics_registry.histogram("request_stage_seconds", "Seconds spent in each stage of a request",
+                                           ["stage"])
+request_seconds = metrics_registry.histogram("http_request_seconds", "Request latency per endpoint", ["endpoint"])
+model_batch_seconds = metrics_registry.histogram("model_batch_seconds", "Forward pass time per micro-batch", ["model"])
+model_batch_size = metrics_registry.histogram("model_batch_size", "Messages per micro-batch", ["model"],
+                                              buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+messages_classified = metrics_registry.counter("messages_classified_total",
+                                               "Classified messages by outcome and cache use", ["result", "cache"])
+model_skips = metrics_registry.counter("model_skips_total",
+                                       "Model runs skipped because the cascade had already decided", ["model"])
+
+# Audit rows (sensitive_data_logs, chat_history, api_usage_rollup) are written in batches by a background thread
+log_writer = BatchedLogWriter(get_db_connection,
+                              max_queue=int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+                              batch_size=int(os.environ.get("LOG_BATCH_SIZE", "500")),
+                              flush_interval=float(os.environ.get("LOG_FLUSH_INTERVAL", "0.2")),
+                              fallback_path=os.environ.get("LOG_FALLBACK_PATH", "log_fallback.jsonl"))
+if METRICS_ENABLED:
+    log_writer.flush_observer = lambda rows, seconds: stage_seconds.observe(seconds, "sqlite_write")
+log_writer.replay_fallback()
+atexit.register(log_writer.close) # Flushes queued rows on shutdown
+
+# Endpoint usage counters kept in memory and rolled up per minute into api_usage_rollup
+usage_aggregator = EndpointUsageAggregator(log_writer.write, flush_interval=float(os.environ.get("USAGE_FLUSH_INTERVAL", "10")))
+atexit.register(usage_aggregator.flush) # Registered last so it runs before the log writer's final flush
+
+# Live feeds of new chat_history / sensitive_data_logs rows for the admin pages, woken after each log writer commit
+FEED_POLL_INTERVAL = float(os.environ.get("FEED_POLL_INTERVAL", "2"))
+queries_feed = LiveFeed(get_db_connection, "chat_history", "id, question, response, timestamp",
+                        poll_interval=FEED_POLL_INTERVAL)
+sensitive_logs_feed = LiveFeed(get_db_connection, "sensitive_data_logs", poll_interval=FEED_POLL_INTERVAL)
+log_writer.listeners += [queries_feed.notify, sensitive_logs_feed.notify]
+
+def db_timestamp():
+    # Same format and timezone (UTC) as SQLite's CURRENT_TIMESTAMP, taken when the event happens
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def parse_db_timestamp(value):
+    # An ISO timestamp in the CURRENT_TIMESTAMP format; offsets are converted to UTC, naive values are taken as UTC
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+# "pytorch" serves the fine-tuned directories as they are; "onnx" / "onnx-int8" serve the exports written by
+# export_onnx.py through ONNX Runtime (same labels and scores, cheaper on CPU); "student" serves the multi-head
+# model distilled by "train_models.py distill", which gives all three predictions from one forward pass;
+# "stub" replaces the three models with stub_model.py (no weights, STUB_BATCH_MS/STUB_ITEM_MS of simulated work)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "pytorch")
+MODEL_BACKEND_SUFFIXES = {"pytorch": "", "onnx": "_onnx", "onnx-int8": "_onnx_int8"}
+STUDENT_DIR = os.environ.get("STUDENT_DIR", "./student_distilled")
+if MODEL_BACKEND not in MODEL_BACKEND_SUFFIXES and MODEL_BACKEND not in ("student", "stub"):
+    raise ValueError(f"Unknown MODEL_BACKEND {MODEL_BACKEND!r}, expected one of "
+                     f"{', '.join(MODEL_BACKEND_SUFFIXES)}, student, stub")
+STUB_BATCH_MS = float(os.environ.get("STUB_BATCH_MS", "0"))
+STUB_ITEM_MS = float(os.environ.get("STUB_ITEM_MS", "0"))
+
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "eager")
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "0") == "1"
+
+# Token-aware inference: messages are tokenized once (shared by models with the same vocabulary), batched
+# in length buckets, and split into overlapping TOKEN_WINDOW-token windows instead of truncated
+TOKEN_AWARE_INFERENCE = os.environ.get("TOKEN_AWARE_INFERENCE", "1") == "1"
+TOKEN_WINDOW = int(os.environ.get("TOKEN_WINDOW", "512"))
+TOKEN_WINDOW_OVERLAP = int(os.environ.get("TOKEN_WINDOW_OVERLAP", "64"))
+MAX_BATCH_TOKENS = int(os.environ.get("MAX_BATCH_TOKENS", "8192"))
+
+# Pins torch intra-op threads so the concurrently running models don't oversubscribe the CPU
+INTRA_OP_THREADS = os.environ.get("INTRA_OP_THREADS")
+if INTRA_OP_THREADS:
+    torch.set_num_threads(int(INTRA_OP_THREADS))
+
+def load_classifier(model_dir):
+    # Builds the classifier for model_dir with the configured MODEL_BACKEND
+    path = model_dir + MODEL_BACKEND_SUFFIXES[MODEL_BACKEND]
+    if MODEL_BACKEND == "pytorch":
+        # With MODEL_MMAP the safetensors weights are used in place, so the pages stay shared with the file cache
+        model_kwargs = {"low_cpu_mem_usage": True, "use_safetensors": True} if MODEL_MMAP else {}
+        classifier = pipeline("text-classification", model=path, tokenizer=path, model_kwargs=model_kwargs)
+    else:
+        # ONNX Runtime and optimum are only needed for the ONNX backends
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        session_options = onnxruntime.SessionOptions()
+        if INTRA_OP_THREADS:
+            session_options.intra_op_num_threads = int(INTRA_OP_THREADS)
+        model = ORTModelForSequenceClassification.from_pretrained(path, session_options=session_options)
+        classifier = pipeline("text-classification", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+    if TOKEN_AWARE_INFERENCE:
+        # Same label/score output, but length-bucketed batches and windowed (not truncated) long messages
+        return TokenAwareClassifier(classifier.model, classifier.tokenizer, max_length=TOKEN_WINDOW,
+                                    stride=TOKEN_WINDOW_OVERLAP, max_batch_tokens=MAX_BATCH_TOKENS)
+    return classifier
+
+# spaCy NER: entity types that count as sensitive, and nlp.pipe settings for batches of messages
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "en_core_web_sm")
+SPACY_ENTITY_LABELS = {"MONEY", "PERSON", "ORG"}
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", "64"))
+SPACY_PROCESSES = int(os.environ.get("SPACY_PROCESSES", "1"))
+SPACY_PARALLEL_MIN = int(os.environ.get("SPACY_PARALLEL_MIN", "256"))
+
+# Micro-batching: concurrent /chat requests share one forward pass per model
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+
+def load_spacy():
+    # Only NER is used, so the tagger, parser, lemmatizer etc. are never loaded or run
+    nlp = spacy.load(SPACY_MODEL, exclude=["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"])
+    if "tok2vec" in nlp.pipe_names and "ner" not in nlp.get_pipe("tok2vec").listening_components:
+        # In en_core_web_sm the NER has its own embedding layer; the shared tok2vec only fed the excluded components
+        nlp.remove_pipe("tok2vec")
+    return nlp
+
+# Load sNLP models for detecting sensitive data. They are loaded through the registry: in parallel threads
+# ("eager", the default, waits for them), in the background while the app already serves non-chat routes
+# ("background"), or on first use ("lazy"). The batchers resolve their model when the first batch runs.
+model_registry = ModelRegistry(MODEL_LOADING, max_workers=int(os.environ.get("MODEL_LOADING_THREADS", "4")))
+model_registry.register("spacy", load_spacy)
+if MODEL_BACKEND == "student":
+    # The student replaces the three teachers, which are not loaded at all
+    # With TOKEN_AWARE_INFERENCE long messages are windowed at the student's own 128-token length, not TOKEN_WINDOW
+    model_registry.register("student", lambda: StudentClassifier(STUDENT_DIR, token_aware=TOKEN_AWARE_INFERENCE,
+                                                                 stride=TOKEN_WINDOW_OVERLAP,
+                                                                 max_batch_tokens=MAX_BATCH_TOKENS))
+    student_batcher = MicroBatcher(model_registry.caller("student"), BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name="student")
+    model_batchers = {}
+    active_batchers = [student_batcher]
+else:
+    if MODEL_BACKEND == "stub":
+        for name in PREDICTION_MODELS:
+            model_registry.register(name, lambda name=name: StubClassifier(name, STUB_BATCH_MS, STUB_ITEM_MS))
+    else:
+        model_registry.register("bert", lambda: load_classifier("./bert_finetuned"))
+        model_registry.register("finbert", lambda: load_classifier("./finbert_finetuned"))
+        model_registry.register("zero_shot", lambda: load_classifier("./zero_shot_finetuned"))
+    bert_batcher = MicroBatcher(model_registry.caller("bert"), BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name="bert")
+    finbert_batcher = MicroBatcher(model_registry.caller("finbert"), BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name="finbert")
+    zero_shot_batcher = MicroBatcher(model_registry.caller("zero_shot"), BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+                                     name="zero_shot")
+    model_batchers = {"bert": bert_batcher, "finbert": finbert_batcher, "zero_shot": zero_shot_batcher}
+    active_batchers = list(model_batchers.values())
+model_registry.start()
+
+def batch_observer(name):
+    # Records the forward pass time and size of each of a batcher's micro-batches
+    def observe(size, seconds):
+        model_batch_seconds.observe(seconds, name)
+        model_batch_size.observe(size, name)
+    return observe
+
+if METRICS_ENABLED:
+    for batcher in active_batchers:
+        batcher.observer = batch_observer(batcher.name)
+
+# "parallel" runs the three models and the spaCy/regex stage at the same time, "serial" one after another,
+# "cascade" runs spaCy/regex first and only calls the models (in CASCADE_ORDER) until one of them decides
+DETECTION_MODE = os.environ.get("DETECTION_MODE", "parallel")
+CASCADE_ORDER = [name.strip() for name in os.environ.get("CASCADE_ORDER", "bert,finbert,zero_shot").split(",")
+                 if name.strip() in PREDICTION_MODELS]
+
+financial_keywords = [
+    r"\b(transfer|payment|deposit|withdraw|balance|account|card)\s+\$?\d+(?:\.\d{2})?\b",
+    r"\bcredit card\s*(?:number)?\s*[0-9-]{13,16}\b",
+    r"\baccount\s*(?:number)?\s*\d{8,12}\b",
+    r"\bbank account\s*(?:number)?\s*\d{8,12}\b",
+    r"\bpin\s*\d{4}\b",
+    r"\btransaction\s*(?:ID|number)?\s*[A-Za-z0-9]{6,12}\b",
+    r"\btransfer\s+\$?\d+(?:\.\d{2})?\s+to\s+(?:account|card)\s*\d{8,12}\b",
+    r"\bpayment\s+of\s+\$?\d+(?:\.\d{2})?\b",
+    r"\bdeposit\s+of\s+\$?\d+(?:\.\d{2})?\b",
+    r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+]
+
+# Built-in financial rules plus the admin-managed sensitive_rules table, compiled into one pattern
+RULES_RELOAD_INTERVAL = float(os.environ.get("RULES_RELOAD_INTERVAL", "5"))
+rule_engine = RuleEngine(get_db_connection, builtin_rules=financial_keywords, reload_interval=RULES_RELOAD_INTERVAL)
+
+# Content-hash cache for message and uploaded-file detection results
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "3600"))
+detection_cache = ResultCache(CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+# Cached detection results are dropped when any file in these directories changes
+if MODEL_BACKEND == "student":
+    MODEL_DIRS = [STUDENT_DIR]
+elif MODEL_BACKEND == "stub":
+    MODEL_DIRS = []
+else:
+    MODEL_DIRS = [model_dir + MODEL_BACKEND_SUFFIXES[MODEL_BACKEND]
+                  for model_dir in ["./bert_finetuned", "./finbert_finetuned", "./zero_shot_finetuned"]]
+MODEL_CHECK_INTERVAL = float(os.environ.get("MODEL_CHECK_INTERVAL", "30"))
+_model_fingerprint = {"value": None, "checked_at": 0.0}
+
+def rule_stage_from_doc(message, doc):
+    """
+       Entity and regex-rule spans are collected on the original message, then redacted in one linear pass.
+       Returns the detected entities, the redacted message and the findings
+       ({"start", "end", "text", "source": "ner" or "rule", "label": entity label or rule}).
+       """
+    entity_labels = {ent.text: ent.label_ for ent in doc.ents if ent.label_ in SPACY_ENTITY_LABELS}
+    detected_entities = [ent.text for ent in doc.ents if ent.label_ in SPACY_ENTITY_LABELS]
+    findings = []
+    if detected_entities:
+        # Every occurrence of a detected entity is redacted, not only the one spaCy tagged (one regex pass for all)
+        entity_pattern = re.compile("|".join(re.escape(text) for text in sorted(entity_labels, key=len, reverse=True)))
+        findings.extend({"start": match.start(), "end": match.end(), "text": match.group(), "source": "ner",
+                         "label": entity_labels[match.group()]} for match in entity_pattern.finditer(message))
+    for start, end, matched_text, rule in rule_engine.find(message):
+        detected_entities.append(matched_text)
+        findings.append({"start": start, "end": end, "text": matched_text, "source": "rule", "label": rule})
+    if not findings:
+        return detected_entities, message, findings
+    findings.sort(key=lambda finding: (finding["start"], finding["end"]))
+    return detected_entities, redact_spans(message, [(finding["start"], finding["end"]) for finding in findings]), findings
+
+def run_rule_stage(message):
+    # spaCy entity recognition plus regex rules; returns the detected entities, the redacted message and the findings
+    return rule_stage_from_doc(message, model_registry.get("spacy")(message))
+
+def run_rule_stages(messages, timings=None):
+    # Same as run_rule_stage for a batch: spaCy processes them with nlp.pipe, in SPACY_PROCESSES processes for big batches
+    n_process = SPACY_PROCESSES if len(messages) >= SPACY_PARALLEL_MIN else 1
+    nlp = model_registry.get("spacy")
+    with stage_seconds.time("spacy") as spacy_timer:
+        docs = list(nlp.pipe(messages, batch_size=SPACY_BATCH_SIZE, n_process=n_process))
+    with stage_seconds.time("rules") as rules_timer:
+        rule_stages = [rule_stage_from_doc(message, doc) for message, doc in zip(messages, docs)]
+    if timings is not None:
+        timings.update(spacy=spacy_timer.elapsed, rules=rules_timer.elapsed)
+    return rule_stages
+
+def is_model_sensitive(result):
+    # A model flags a message when it predicts LABEL_1 with enough confidence
+    return result["label"] == "LABEL_1" and result["score"] > SENSITIVE_THRESHOLD
+
+def normalize_model_result(name, result):
+    # Normalizes zero-shot labels
+    if name == "zero_shot":
+        label = "LABEL_1" if result["label"] in ["sensitive", "LABEL_1"] else "LABEL_0"
+        return {"label": label, "score": result["score"]}
+    return result
+
+def format_prediction(result):
+    # Stored as e.g. "LABEL_1 (0.93)", or "SKIPPED" when the cascade never ran the model
+    if result is None:
+        return "SKIPPED"
+    return f"{result['label']} ({result['score']:.2f})"
+
+def prediction_columns(result):
+    # (label, score) for the structured columns; (None, None) when the cascade never ran the model
+    if result is None:
+        return None, None
+    return int(result["label"] == "LABEL_1"), float(result["score"])
+
+def model_dirs_fingerprint():
+    # (file, mtime, size) of every model file, rechecked at most every MODEL_CHECK_INTERVAL seconds
+    now = time.monotonic()
+    if _model_fingerprint["value"] is None or now - _model_fingerprint["checked_at"] >= MODEL_CHECK_INTERVAL:
+        stats = []
+        for model_dir in MODEL_DIRS:
+            if os.path.isdir(model_dir):
+                for entry in sorted(os.scandir(model_dir), key=lambda entry: entry.name):
+                    if entry.is_file():
+                        stats.append((model_dir, entry.name, entry.stat().st_mtime, entry.stat().st_size))
+        _model_fingerprint.update(value=tuple(stats), checked_at=now)
+    return _model_fingerprint["value"]
+
+def refresh_cache_generation():
+    # Clears cached results when the rules or model files have changed
+    detection_cache.set_generation((rule_engine.current_version(), model_dirs_fingerprint(), DETECTION_MODE))
+
+def classify_message(message):
+    """
+       Runs the detection stages on a message and returns the outcome as a dict
+       (is_sensitive, redacted_message, detected_entities, findings, model_results, skipped_stages).
+       Results are cached by content hash until the rules or model files change.
+       """
+    return classify_messages([message])[0]
+
+# Stage timings attached to results served from the cache (METRICS_LOG_TIMINGS)
+CACHE_HIT_TIMINGS = {"cache_hit": 1}
+
+def timing_fields(timings):
+    # Stage durations in seconds -> {"<stage>_ms": ...} for the stage_timings column
+    return {f"{stage}_ms": round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+def gather_model_futures(futures, started, timings):
+    """
+       Collects the results of {model name: [futures]}. With metrics on, also records in `timings`
+       when each model's last result arrived (seconds since `started`), in completion order.
+       """
+    if METRICS_ENABLED:
+        owners = {future: name for name, model_futures in futures.items() for future in model_futures}
+        remaining = {name: len(model_futures) for name, model_futures in futures.items()}
+        for future in as_completed(owners):
+            name = owners[future]
+            remaining[name] -= 1
+            if remaining[name] == 0:
+                timings[name] = time.perf_counter() - started
+                stage_seconds.observe(timings[name], name)
+    return {name: [future.result() for future in model_futures] for name, model_futures in futures.items()}
+
+def classify_messages(messages):
+    """
+       Batch version of classify_message: uncached messages go through spaCy in one nlp.pipe call
+       and are queued on the model batchers together, so they share forward passes.
+       """
+    refresh_cache_generation()
+    cache_keys = [content_key("message", message) for message in messages]
+    results = [detection_cache.get(cache_key) for cache_key in cache_keys]
+    pending = [index for index, result in enumerate(results) if result is None]
+    if METRICS_ENABLED and len(pending) < len(results):
+        for result in results:
+            if result is not None:
+                messages_classified.inc("sensitive" if result["is_sensitive"] else "clean", "hit")
+        if METRICS_LOG_TIMINGS:
+            results = [result and {**result, "timings": CACHE_HIT_TIMINGS} for result in results]
+    if not pending:
+        return results
+    texts = [messages[index] for index in pending]
+
+    # Seconds per stage for this batch; the model stages are timed from submission to their last result
+    timings = {}
+    started = time.perf_counter()
+    model_results = [{} for _ in texts]
+    if MODEL_BACKEND == "student":
+        # One student forward pass yields all three predictions; cascade only saves it when the rules already decided
+        if DETECTION_MODE == "cascade":
+            rule_stages = run_rule_stages(texts, timings)
+            undecided = [i for i, (entities, _, _) in enumerate(rule_stages) if not entities]
+            with stage_seconds.time("student") as timer:
+                predictions = student_batcher.predict_many([texts[i] for i in undecided])
+            timings["student"] = timer.elapsed
+            for i, prediction in zip(undecided, predictions):
+                model_results[i] = prediction
+        else:
+            futures = {"student": [student_batcher.submit(text) for text in texts]}
+            rule_stages = run_rule_stages(texts, timings)
+            model_results = gather_model_futures(futures, started, timings)["student"]
+    elif DETECTION_MODE == "parallel":
+        # Queues the messages on all three batchers, then runs spaCy/regex while the models work
+        futures = {name: [batcher.submit(text) for text in texts] for name, batcher in model_batchers.items()}
+        rule_stages = run_rule_stages(texts, timings)
+        for name, predictions in gather_model_futures(futures, started, timings).items():
+            for i, prediction in enumerate(predictions):
+                model_results[i][name] = prediction
+    elif DETECTION_MODE == "cascade":
+        # Runs the cheap stages first and only falls through to the models while nothing has decided yet
+        rule_stages = run_rule_stages(texts, timings)
+        for name in CASCADE_ORDER:
+            undecided = [i for i, (entities, _, _) in enumerate(rule_stages)
+                         if not entities and not any(is_model_sensitive(result) for result in model_results[i].values())]
+            if not undecided:
+                break
+            with stage_seconds.time(name) as timer:
+                predictions = model_batchers[name].predict_many([texts[i] for i in undecided])
+            timings[name] = timer.elapsed
+            for i, prediction in zip(undecided, predictions):
+                model_results[i][name] = normalize_model_result(name, prediction)
+    else:
+        # It runs messages through multiple models (batched with other in-flight requests)
+        for name, batcher in model_batchers.items():
+            with stage_seconds.time(name) as timer:
+                predictions = batcher.predict_many(texts)
+            timings[name] = timer.elapsed
+            for i, prediction in enumerate(predictions):
+                model_results[i][name] = prediction
+        rule_stages = run_rule_stages(texts, timings)
+    timings["detection"] = time.perf_counter() - started
+    stage_seconds.observe(timings["detection"], "detection")
+
+    for i, index in enumerate(pending):
+        detected_entities, redacted_message, findings = rule_stages[i]
+        message_results = {name: normalize_model_result(name, result) for name, result in model_results[i].items()}
+        # Determines if the message is sensitive based on model outputs or rule triggers
+        model_sensitive = any(is_model_sensitive(result) for result in message_results.values())
+        rules_triggered = len(detected_entities) > 0
+        results[index] = {
+            "is_sensitive": model_sensitive or rules_triggered,
+            "redacted_message": redacted_message,
+            "detected_entities": detected_entities,
+            "findings": findings,
+            "model_results": message_results,
+            "skipped_stages": [name for name in PREDICTION_MODELS if name not in message_results],
+        }
+        detection_cache.put(cache_keys[index], results[index])
+        if METRICS_ENABLED:
+            messages_classified.inc("sensitive" if results[index]["is_sensitive"] else "clean", "miss")
+            for name in results[index]["skipped_stages"]:
+                model_skips.inc(name)
+            if METRICS_LOG_TIMINGS:
+                # Cached without timings, so later hits don't report this batch's
+                results[index] = {**results[index], "timings": timing_fields(timings)}
+    return results
+
+DETECTION_LOG_SQL = '''INSERT INTO sensitive_data_logs (
+                        user_id, prompt, detected_data, bert_prediction, finbert_prediction, zero_shot_prediction,
+                        is_sensitive, skipped_stages, timestamp,
+                        bert_label, bert_score, finbert_label, finbert_score, zero_shot_label, zero_shot_score,
+                        stage_timings
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+def detection_log_params(result, message, user_id):
+    # One sensitive_data_logs row (DETECTION_LOG_SQL parameters) for a detection result
+    detected_entities = result["detected_entities"]
+    model_results = result["model_results"]
+    detected_data = ", ".join(set(detected_entities)) if detected_entities else "N/A"
+    bert_pred = format_prediction(model_results.get("bert"))
+    finbert_pred = format_prediction(model_results.get("finbert"))
+    zero_shot_pred = format_prediction(model_results.get("zero_shot"))
+    return (user_id, message, detected_data, bert_pred, finbert_pred, zero_shot_pred,
+            int(result["is_sensitive"]), ", ".join(result["skipped_stages"]) or None, db_timestamp(),
+            *prediction_columns(model_results.get("bert")),
+            *prediction_columns(model_results.get("finbert")),
+            *prediction_columns(model_results.get("zero_shot")),
+            json.dumps(result["timings"]) if "timings" in result else None)
+
+def log_detection(result, message, user_id):
+    # Queues the detection results for the sensitive_data_logs table
+    log_writer.write(DETECTION_LOG_SQL, detection_log_params(result, message, user_id))
 
 def detect_sensitive_data(message, user_id):
     """
@@ -86,90 +578,75 @@ def detect_sensitive_data(message, user_id):
        - BERT-based classifiers for general and financial sensitivity
        Logs detection results into the database.
        """
-    redacted_message = message # It will replace sensitive content with [REDACTED]
+    result = classify_message(message)
+    # Cache hits are logged too, so the audit trail has one row per scanned message
+    log_detection(result, message, user_id)
+    return result["is_sensitive"], result["redacted_message"]
 
-    # It runs message through multiple models
-    bert_result = bert_classifier(message)[0]
-    finbert_result = finbert_classifier(message)[0]
-    zero_shot_result = zero_shot_classifier(message)[0]
+def scan_texts(texts, user_id=None, log=True):
+    """
+       Batch counterpart of detect_sensitive_data for pre-screening many records at once:
+       - All texts go through classify_messages together (one nlp.pipe call, shared model batches)
+       - Returns one dict per text, in order: is_sensitive, redacted_text, findings (character spans
+         in the original text), model_results and skipped_stages
+       - With `log`, their sensitive_data_logs rows are committed in a single transaction
+       """
+    results = classify_messages(texts)
+    if log:
+        log_writer.write_many(DETECTION_LOG_SQL, [detection_log_params(result, text, user_id)
+                                                  for text, result in zip(texts, results)])
+    return [{
+        "is_sensitive": result["is_sensitive"],
+        "redacted_text": result["redacted_message"],
+        "findings": result["findings"],
+        "model_results": result["model_results"],
+        "skipped_stages": result["skipped_stages"],
+    } for result in results]
 
-    # Normalizes zero-shot labels
-    zero_shot_label = "LABEL_1" if zero_shot_result["label"] in ["sensitive", "LABEL_1"] else "LABEL_0"
-    zero_shot_score = zero_shot_result["score"]
-
-    # UsesspaCy for entity recognition
-    doc = nlp(message)
-    detected_entities = []
-    for ent in doc.ents:
-        if ent.label_ in ["MONEY", "PERSON", "ORG"]:
-            detected_entities.append(ent.text)
-            redacted_message = redacted_message.replace(ent.text, "[REDACTED]")
-
-    financial_keywords = [
-        r"\b(transfer|payment|deposit|withdraw|balance|account|card)\s+\$?\d+(?:\.\d{2})?\b",
-        r"\bcredit card\s*(?:number)?\s*[0-9-]{13,16}\b",
-        r"\baccount\s*(?:number)?\s*\d{8,12}\b",
-        r"\bbank account\s*(?:number)?\s*\d{8,12}\b",
-        r"\bpin\s*\d{4}\b",
-        r"\btransaction\s*(?:ID|number)?\s*[A-Za-z0-9]{6,12}\b",
-        r"\btransfer\s+\$?\d+(?:\.\d{2})?\s+to\s+(?:account|card)\s*\d{8,12}\b",
-        r"\bpayment\s+of\s+\$?\d+(?:\.\d{2})?\b",
-        r"\bdeposit\s+of\s+\$?\d+(?:\.\d{2})?\b",
-        r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-    ]
-    for rule in financial_keywords:
-        matches = re.findall(rule, message, re.IGNORECASE)
-        if matches:
-            detected_entities.extend(matches)
-            redacted_message = re.sub(rule, "[REDACTED]", redacted_message, flags=re.IGNORECASE)
-
-    # Determines if the message is sensitive based on model outputs or rule triggers
-    model_sensitive = (
-        (bert_result["label"] == "LABEL_1" and bert_result["score"] > 0.7) or
-        (finbert_result["label"] == "LABEL_1" and finbert_result["score"] > 0.7) or
-        (zero_shot_label == "LABEL_1" and zero_shot_score > 0.7)
-    )
-    rules_triggered = len(detected_entities) > 0
-    is_sensitive = model_sensitive or rules_triggered
-
-    # Logs detection results in the sensitive_data_logs table
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    detected_data = ", ".join(set(detected_entities)) if detected_entities else "N/A"
-    bert_pred = f"{bert_result['label']} ({bert_result['score']:.2f})"
-    finbert_pred = f"{finbert_result['label']} ({finbert_result['score']:.2f})"
-    zero_shot_pred = f"{zero_shot_label} ({zero_shot_score:.2f})"
-    cursor.execute('''INSERT INTO sensitive_data_logs (
-                        user_id, prompt, detected_data, bert_prediction, finbert_prediction, zero_shot_prediction, is_sensitive
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                   (user_id, message, detected_data, bert_pred, finbert_pred, zero_shot_pred, int(is_sensitive)))
-    conn.commit()
-    conn.close()
+# Records API usage (except pre-flight OPTIONS) in memory; the aggregator periodically flushes it to api_usage_rollup
+@app.before_request
+def before_request():
+    g.request_started = time.perf_counter()
 
-    return is_sensitive, redacted_message
+@app.teardown_request
+def record_api_usage(exception=None):
+    started = g.pop("request_started", None)
+    if started is not None and request.method != "OPTIONS":
+        elapsed = time.perf_counter() - started
+        usage_aggregator.record(request.path, elapsed * 1000)
+        request_seconds.observe(elapsed, request.endpoint or "unmatched")
 
-def log_api_request(endpoint):
-    """
-      Logs each API endpoint call, avoiding duplicate consecutive logs for the same endpoint.
-      """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT endpoint, timestamp FROM api_logs ORDER BY id DESC LIMIT 1")
-        last_log = cursor.fetchone()
-        if not last_log or last_log["endpoint"] != endpoint:
-            cursor.execute("INSERT INTO api_logs (endpoint) VALUES (?)", (endpoint,))
-            conn.commit()
-        conn.close()
-    except Exception as e:
-        print("Error logging API request:", str(e))
+@app.route("/health", methods=["GET"])
+def health():
+    # Readiness: 200 once every model has loaded, 503 while any is still loading (or failed); the process is live either way
+    models = model_registry.status()
+    if model_registry.ready():
+        return jsonify({"status": "ready", "models": models}), 200
+    failed = any(model["state"] == "failed" for model in models.values())
+    return jsonify({"status": "failed" if failed else "loading", "models": models}), 503
 
+# Values other components already keep are read when /metrics is scraped, not tracked on the request path
+metrics_registry.callback("batcher_queue_depth", "Messages waiting for a model micro-batch",
+                          lambda: {(batcher.name,): batcher.queue_depth() for batcher in active_batchers}, ["model"])
+metrics_registry.callback("log_writer_queue_depth", "Audit rows waiting for the log writer", log_writer.queue_depth)
+metrics_registry.callback("log_writer_rows_total", "Audit rows committed or saved to the fallback file",
+                          lambda: {("written",): log_writer.written, ("failed",): log_writer.failed}, ["status"],
+                          kind="counter")
+metrics_registry.callback("detection_cache_lookups_total", "Detection cache lookups (messages and files)",
+                          lambda: {(result,): detection_cache.stats()[f"{result}s"] for result in ("hit", "miss")},
+                          ["result"], kind="counter")
+metrics_registry.callback("detection_cache_bytes", "Approximate size of the cached detection results",
+                          lambda: detection_cache.stats()["bytes"])
+metrics_registry.callback("model_ready", "1 once the model has loaded",
+                          lambda: {(name,): int(model["state"] == "ready") for name, model in model_registry.status().items()},
+                          ["model"])
 
-# logs API usage before each request (except pre-flight OPTIONS)
-@app.before_request
-def before_request():
-    if request.method != "OPTIONS":
-        log_api_request(request.path)
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Prometheus text format; each worker process reports its own counters
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=0)"}), 404
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
 
 # ------------------------ User Management Endpoints ------------------------
 @app.route("/register", methods=["POST"])
@@ -276,28 +753,263 @@ def profile():
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def extract_text_from_pdf(file_path):
-    text = ""
-    try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
+# Uploads are scanned as a stream of overlapping windows instead of one giant string
+STREAM_CHUNK_CHARS = int(os.environ.get("STREAM_CHUNK_CHARS", "2000"))
+STREAM_CHUNK_OVERLAP = int(os.environ.get("STREAM_CHUNK_OVERLAP", "200"))
+STREAM_STOP_EARLY = os.environ.get("STREAM_STOP_EARLY", "1") == "1"
+TABLE_CHUNK_ROWS = int(os.environ.get("TABLE_CHUNK_ROWS", "1000"))
+FILE_PROMPT_MAX_CHARS = int(os.environ.get("FILE_PROMPT_MAX_CHARS", "12000"))
+
+# CSV/Excel uploads are scanned column by column with vectorized pandas string ops
+TABULAR_SCAN = os.environ.get("TABULAR_SCAN", "1") == "1"
+TABULAR_SAMPLE_ROWS = int(os.environ.get("TABULAR_SAMPLE_ROWS", "20"))
+TABULAR_COLUMN_THRESHOLD = float(os.environ.get("TABULAR_COLUMN_THRESHOLD", "0.5"))
+
+def iter_pdf_pages(file_path):
+    # Yields the text of one page at a time; encrypted or corrupt files raise, so callers can tell them from empty ones
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            with stage_seconds.time("pdf_extract"):
                 page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-    except Exception as e:
-        print("Error extracting PDF text:", str(e))
-    return text or "Unable to extract text from the PDF."
+            if page_text:
+                yield page_text + "\n"
+
+def iter_excel_frames(file_path):
+    # Yields (sheet name, DataFrame of TABLE_CHUNK_ROWS rows) from every sheet; .xlsx sheets are read row by row
+    # in read-only mode
+    if not file_path.endswith(".xlsx"):
+        # Legacy .xls has no streaming reader, so each sheet is loaded whole
+        for sheet_name, df in pd.read_excel(file_path, sheet_name=None).items():
+            for start in range(0, len(df), TABLE_CHUNK_ROWS):
+                yield sheet_name, df.iloc[start:start + TABLE_CHUNK_ROWS]
+        return
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= TABLE_CHUNK_ROWS:
+                    yield sheet.title, pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield sheet.title, pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def iter_csv_frames(file_path):
+    # Yields DataFrames of TABLE_CHUNK_ROWS rows without loading the whole file
+    yield from pd.read_csv(file_path, chunksize=TABLE_CHUNK_ROWS)
+
+def iter_file_pieces(file_path, filename):
+    # Yields the text of an upload piece by piece (pages or row chunks)
+    if filename.endswith(".pdf"):
+        yield from iter_pdf_pages(file_path)
+    elif filename.endswith(".xlsx") or filename.endswith(".xls"):
+        for _, frame in iter_excel_frames(file_path):
+            yield frame.to_string() + "\n"
+    elif filename.endswith(".csv"):
+        for frame in iter_csv_frames(file_path):
+            yield frame.to_string() + "\n"
+    else:
+        yield f"File {filename} uploaded but could not be read."
+
+def iter_windows(pieces, size=STREAM_CHUNK_CHARS, overlap=STREAM_CHUNK_OVERLAP):
+    """
+       Regroups text pieces into windows of `size` characters, each repeating the last `overlap`
+       characters of the previous one so entities across a boundary are seen whole.
+       Yields (window, new_text) where new_text is the part not already covered by the previous window.
+       """
+    overlap = min(overlap, size // 2)
+    buffer = ""
+    carried = 0
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        while len(buffer) - start >= size:
+            window = buffer[start:start + size]
+            yield window, window[carried:]
+            start += size - overlap
+            carried = overlap
+        buffer = buffer[start:]
+    if len(buffer) > carried:
+        yield buffer, buffer[carried:]
 
-def extract_data_from_excel(file_path):
-    df = pd.read_excel(file_path)
-    return df.to_string()
+def sensitive_probability(result):
+    return result["score"] if result["label"] == "LABEL_1" else 1 - result["score"]
 
-def extract_data_from_csv(file_path):
-    df = pd.read_csv(file_path)
-    return df.to_string()
+def merge_detection_results(total, result):
+    # Combines per-window results: any sensitive window makes the file sensitive, each model keeps its strongest evidence
+    if total is None:
+        return {**result, "detected_entities": list(result["detected_entities"])}
+    model_results = dict(total["model_results"])
+    for name, model_result in result["model_results"].items():
+        if name not in model_results or sensitive_probability(model_result) > sensitive_probability(model_results[name]):
+            model_results[name] = model_result
+    return {
+        "is_sensitive": total["is_sensitive"] or result["is_sensitive"],
+        "redacted_message": None,
+        "detected_entities": total["detected_entities"] + result["detected_entities"],
+        "model_results": model_results,
+        "skipped_stages": [name for name in PREDICTION_MODELS if name not in model_results],
+    }
+
+def scan_stream(pieces):
+    """
+       Scans a stream of text pieces window by window in bounded memory.
+       Stops at the first sensitive window when STREAM_STOP_EARLY is set.
+       Returns the merged result, up to FILE_PROMPT_MAX_CHARS of text for the prompt,
+       and the window to record in the audit log.
+       """
+    total = None
+    prompt_parts = []
+    prompt_chars = 0
+    evidence = None
+    for window, new_text in iter_windows(pieces):
+        result = classify_message(window)
+        # The audit log records the first window, or the first sensitive one once there is one
+        if evidence is None or (result["is_sensitive"] and not total["is_sensitive"]):
+            evidence = window
+        total = merge_detection_results(total, result)
+        if prompt_chars < FILE_PROMPT_MAX_CHARS:
+            prompt_parts.append(new_text[:FILE_PROMPT_MAX_CHARS - prompt_chars])
+            prompt_chars += len(prompt_parts[-1])
+        if total["is_sensitive"] and STREAM_STOP_EARLY:
+            break
+    return total, "".join(prompt_parts), evidence
+
+def is_table_file(filename):
+    return filename.endswith(".csv") or filename.endswith(".xlsx") or filename.endswith(".xls")
+
+def column_name(finding):
+    # "Sheet2!ssn" for workbook columns, "ssn" for CSV columns
+    return f"{finding['sheet']}!{finding['column']}" if "sheet" in finding else finding["column"]
+
+def scan_table(file_path, filename):
+    """
+       Column-aware scan of a CSV/Excel upload. Returns the merged result, up to
+       FILE_PROMPT_MAX_CHARS of the redacted table for the prompt, and per-column findings.
+       """
+    if filename.endswith(".csv"):
+        frames = ((None, frame) for frame in iter_csv_frames(file_path))
+    else:
+        frames = iter_excel_frames(file_path)
+    scanner = TabularScanner(rule_engine.pattern(), classify_messages, TABULAR_SAMPLE_ROWS, TABULAR_COLUMN_THRESHOLD)
+    prompt_parts = []
+    prompt_chars = 0
+    for sheet, frame in frames:
+        redacted_frame = scanner.scan(frame, sheet)
+        if prompt_chars < FILE_PROMPT_MAX_CHARS:
+            prompt_parts.append((redacted_frame.to_string() + "\n")[:FILE_PROMPT_MAX_CHARS - prompt_chars])
+            prompt_chars += len(prompt_parts[-1])
+        if scanner.is_sensitive and STREAM_STOP_EARLY:
+            break
+
+    result = None
+    for column_result in scanner.classifications:
+        result = merge_detection_results(result, column_result)
+    if result is None:
+        result = classify_message(f"File {filename} is empty.")
+    findings = scanner.findings()
+    flagged = [finding for finding in findings if finding["redaction"] != "none"]
+    result = {
+        **result,
+        "is_sensitive": result["is_sensitive"] or scanner.is_sensitive,
+        "detected_entities": result["detected_entities"] + [
+            f"column {column_name(finding)} ({finding['rule_matches']} rule matches)" for finding in flagged],
+    }
+    return result, "".join(prompt_parts), findings
+
+def scan_upload(file_path, filename):
+    """
+       Scans an uploaded file without logging it. Returns a dict with the merged detection
+       result, the file text for the prompt, the evidence to log and per-column findings for tables.
+       Free text is streamed in windows; when it is clean nothing was redacted, so the
+       prompt text is the original content.
+       """
+    refresh_cache_generation()
+    tabular = TABULAR_SCAN and is_table_file(filename)
+    cache_key = file_key(file_path, "table-scan" if tabular else "file-scan", os.path.splitext(filename)[1].lower())
+    cached = detection_cache.get(cache_key)
+    if cached is not None:
+        if METRICS_LOG_TIMINGS:
+            return {**cached, "result": {**cached["result"], "timings": CACHE_HIT_TIMINGS}}
+        return cached
+    with stage_seconds.time("file_scan") as timer:
+        findings = []
+        if tabular:
+            result, prompt_text, findings = scan_table(file_path, filename)
+            evidence = "columns " + ", ".join(column_name(finding) for finding in findings)
+        else:
+            try:
+                result, prompt_text, evidence = scan_stream(iter_file_pieces(file_path, filename))
+            except Exception as e:
+                if not filename.endswith(".pdf"):
+                    raise
+                # An unreadable PDF is answered with the fallback below instead of failing the chat request
+                print("Error extracting PDF text:", str(e))
+                result = None
+        if result is None:
+            fallback = "Unable to extract text from the PDF." if filename.endswith(".pdf") else f"File {filename} is empty."
+            result, prompt_text, evidence = classify_message(fallback), fallback, fallback
+    # Window-level timings don't describe the whole file, so they are neither cached nor logged for it
+    result = {key: value for key, value in result.items() if key != "timings"}
+    cached = {"result": result, "prompt_text": prompt_text, "evidence": evidence, "findings": findings}
+    detection_cache.put(cache_key, cached)
+    if METRICS_LOG_TIMINGS:
+        return {**cached, "result": {**result, "timings": timing_fields({"file_scan": timer.elapsed})}}
+    return cached
+
+def scan_file(file_path, filename, user_id):
+    # Scans an upload and logs one sensitive_data_logs row; returns (is_sensitive, prompt text, findings)
+    scanned = scan_upload(file_path, filename)
+    log_detection(scanned["result"], f"File {filename}: {scanned['evidence']}", user_id)
+    return scanned["result"]["is_sensitive"], scanned["prompt_text"], scanned["findings"]
+
+def save_chat_history(user_id, question, response):
+    log_writer.write("INSERT INTO chat_history (user_id, question, response, timestamp) VALUES (?, ?, ?, ?)",
+                     (user_id, question, response, db_timestamp()))
 
 # ------------------------ Chat Endpoint ------------------------
+SENSITIVE_RESPONSE = "Message or file contains sensitive data and has been redacted."
+STREAM_HOLDBACK_CHARS = int(os.environ.get("STREAM_HOLDBACK_CHARS", "128"))
+
+def screen_chat_request(user_id, message, file):
+    """
+       Input-side detection shared by /chat and /chat/stream.
+       Returns (is_sensitive, prompt for the LLM, per-column findings for tabular uploads).
+       """
+    if file:
+        filename = secure_filename(file.filename)
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        with stage_seconds.time("file_save"):
+            file.save(filepath)
+        is_sensitive_file, file_content, file_findings = scan_file(filepath, filename, user_id)
+        redacted_file_content = file_content
+    else:
+        file_content = None
+        is_sensitive_file = False
+        redacted_file_content = ""
+        file_findings = []
+
+    is_sensitive_msg, redacted_message = detect_sensitive_data(message, user_id)
+
+    prompt = redacted_message
+    if file_content:
+        prompt += f"\n\nFile Content:\n{redacted_file_content}"
+    return is_sensitive_msg or is_sensitive_file, prompt, file_findings
+
+def chat_messages(prompt):
+    return [
+        {"role": "system", "content": "You are a helpful AI assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
 @app.route("/chat", methods=["POST"])
 def chat():
     """
@@ -313,72 +1025,160 @@ def chat():
     message = request.form.get("message")
     file = request.files.get("file")
 
-    if file:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        if filename.endswith(".pdf"):
-            file_content = extract_text_from_pdf(filepath)
-        elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-            file_content = extract_data_from_excel(filepath)
-        elif filename.endswith(".csv"):
-            file_content = extract_data_from_csv(filepath)
-        else:
-            file_content = f"File {filename} uploaded but could not be read."
-        is_sensitive_file, redacted_file_content = detect_sensitive_data(file_content, user_id)
-    else:
-        file_content = None
-        is_sensitive_file = False
-        redacted_file_content = ""
-
-    is_sensitive_msg, redacted_message = detect_sensitive_data(message, user_id)
+    is_sensitive, prompt, file_findings = screen_chat_request(user_id, message, file)
 
-    if is_sensitive_msg or is_sensitive_file:
-        chat_response = "Message or file contains sensitive data and has been redacted."
+    if is_sensitive:
+        chat_response = SENSITIVE_RESPONSE
     else:
-        prompt = redacted_message
-        if file_content:
-            prompt += f"\n\nFile Content:\n{redacted_file_content}"
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with stage_seconds.time("openai"):
+            response = client.chat.completions.create(model=OPENAI_MODEL, messages=chat_messages(prompt))
         chat_response = response.choices[0].message.content
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO chat_history (user_id, question, response) VALUES (?, ?, ?)",
-                   (user_id, message, chat_response))
-    conn.commit()
-    conn.close()
+    save_chat_history(user_id, message, chat_response)
+    if file_findings:
+        return jsonify({"response": chat_response, "file_findings": file_findings})
     return jsonify({"response": chat_response})
 
+def sse_event(payload, event=None, event_id=None):
+    # Formats one server-sent event; event_id is what the browser sends back as Last-Event-ID when it reconnects
+    prefix = f"event: {event}\n" if event else ""
+    if event_id is not None:
+        prefix += f"id: {event_id}\n"
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+       Streaming variant of /chat (server-sent events):
+       - Runs the same input-side detection as /chat before anything is sent
+       - Forwards LLM tokens as "data: {"delta": ...}" events as soon as they arrive,
+         after passing them through the incremental output-side rule filter
+       - Ends with an "event: done" carrying the full (filtered) response
+       """
+    data = request.form
+    user_id = data.get("user_id")
+    message = request.form.get("message")
+    file = request.files.get("file")
+
+    is_sensitive, prompt, file_findings = screen_chat_request(user_id, message, file)
+
+    def generate():
+        if is_sensitive:
+            save_chat_history(user_id, message, SENSITIVE_RESPONSE)
+            yield sse_event({"response": SENSITIVE_RESPONSE, "file_findings": file_findings}, event="done")
+            return
+        redactor = StreamRedactor(rule_engine.find, STREAM_HOLDBACK_CHARS)
+        parts = []
+        try:
+            # Returns once the response headers arrive, so this measures the LLM's time to first byte
+            with stage_seconds.time("openai_first_byte"):
+                stream = client.chat.completions.create(model=OPENAI_MODEL, messages=chat_messages(prompt),
+                                                        stream=True)
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    safe_text = redactor.feed(delta)
+                    if safe_text:
+                        parts.append(safe_text)
+                        yield sse_event({"delta": safe_text})
+            safe_text = redactor.flush()
+            if safe_text:
+                parts.append(safe_text)
+                yield sse_event({"delta": safe_text})
+        except Exception as e:
+            print("Error streaming chat response:", str(e))
+            # Whatever was already streamed is kept in the history; the error event ends the stream
+            if parts:
+                save_chat_history(user_id, message, "".join(parts))
+            yield sse_event({"error": "The language model response was interrupted."}, event="error")
+            return
+        chat_response = "".join(parts)
+        if chat_response:
+            save_chat_history(user_id, message, chat_response)
+        yield sse_event({"response": chat_response, "redactions": redactor.redactions,
+                         "file_findings": file_findings}, event="done")
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ------------------------ Bulk Scan Endpoint ------------------------
+SCAN_MAX_TEXTS = int(os.environ.get("SCAN_MAX_TEXTS", "1000"))
+SCAN_MAX_TEXT_CHARS = int(os.environ.get("SCAN_MAX_TEXT_CHARS", "100000"))
+
+@app.route("/scan", methods=["POST"])
+def scan():
+    """
+       Bulk detection for pipelines, without the LLM call or chat history:
+       - Body: {"texts": [...], "user_id": optional, "log": true}
+       - Returns {"results": [...], "sensitive_count": n} with one entry per text, in order (see scan_texts)
+       """
+    data = request.get_json(silent=True) or {}
+    texts = data.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": "texts must be a list of strings"}), 400
+    if len(texts) > SCAN_MAX_TEXTS:
+        return jsonify({"error": f"At most {SCAN_MAX_TEXTS} texts per request"}), 413
+    if any(len(text) > SCAN_MAX_TEXT_CHARS for text in texts):
+        return jsonify({"error": f"Texts are limited to {SCAN_MAX_TEXT_CHARS} characters"}), 413
+    log = data.get("log", True)
+    # Strings such as "false" would be truthy, so a caller opting out of logging must send a real boolean
+    if not isinstance(log, bool):
+        return jsonify({"error": "log must be true or false"}), 400
+    results = scan_texts(texts, data.get("user_id"), log)
+    return jsonify({"results": results, "sensitive_count": sum(result["is_sensitive"] for result in results)}), 200
+
+# Keyset pagination: pages are read newest first by id, and the next page starts below the last id seen
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+NO_CURSOR = 2 ** 63 - 1
+
+def page_params(source, default_limit=DEFAULT_PAGE_SIZE):
+    # Reads "limit" and "before_id" from query args or a JSON body; raises ValueError on bad values
+    try:
+        limit = int(source.get("limit") or default_limit)
+        before_id = source.get("before_id")
+        before_id = int(before_id) if before_id not in (None, "") else NO_CURSOR
+    except (TypeError, ValueError, OverflowError):
+        # JSON bodies can carry lists, objects or floats such as 1e400
+        raise ValueError("limit and before_id must be integers")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    # Kept within SQLite's 64-bit integers so the query can't overflow
+    return min(limit, MAX_PAGE_SIZE), max(0, min(before_id, NO_CURSOR))
+
 @app.route("/history", methods=["POST"])
 def history():
-    # Fetches the full chat history for a specific user
+    # Fetches a page of the chat history for a specific user (newest first)
     data = request.json
     user_id = data.get("user_id")
     if not user_id:
         return jsonify({"error": "User ID is required"}), 400
+    try:
+        limit, before_id = page_params(data, default_limit=100)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT question, response, timestamp FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC",
-                   (user_id,))
+    cursor.execute("SELECT id, question, response, timestamp FROM chat_history WHERE user_id = ? AND id < ? "
+                   "ORDER BY id DESC LIMIT ?", (user_id, before_id, limit))
     history = cursor.fetchall()
     conn.close()
     # Returns the user's chat history as a list of question/response pairs
     return jsonify(
-        [{"question": row["question"], "response": row["response"], "timestamp": row["timestamp"]} for row in history])
+        [{"id": row["id"], "question": row["question"], "response": row["response"], "timestamp": row["timestamp"]}
+         for row in history])
 
 @app.route("/queries", methods=["GET"])
 def get_queries():
-    # Fetches the latest 20 queries (across all users)
+    # Fetches a page of the latest queries (across all users), 20 by default
+    try:
+        limit, before_id = page_params(request.args, default_limit=20)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT question, response, timestamp FROM chat_history ORDER BY timestamp DESC LIMIT 20")
+    cursor.execute("SELECT id, question, response, timestamp FROM chat_history WHERE id < ? ORDER BY id DESC LIMIT ?",
+                   (before_id, limit))
     queries = cursor.fetchall()
     conn.close()
     return jsonify([dict(query) for query in queries]), 200
@@ -398,11 +1198,19 @@ def add_rule():
     # Adds a new sensitive data detection rule
     data = request.json
     rule = data.get("rule")
+    error = validate_rule(rule)
+    if error:
+        return jsonify({"error": error}), 400
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT INTO sensitive_rules (rule) VALUES (?)", (rule,))
-    conn.commit()
+    try:
+        cursor.execute("INSERT INTO sensitive_rules (rule) VALUES (?)", (rule,))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.close()
+        return jsonify({"error": "Rule already exists"}), 400
     conn.close()
+    rule_engine.invalidate()
     return jsonify({"message": "Rule added successfully"}), 201
 
 @app.route("/rules/delete", methods=["POST"])
@@ -415,66 +1223,112 @@ def delete_rule():
     cursor.execute("DELETE FROM sensitive_rules WHERE id = ?", (rule_id,))
     conn.commit()
     conn.close()
+    rule_engine.invalidate()
     return jsonify({"message": "Rule deleted successfully"}), 200
 
 @app.route("/logs", methods=["GET"])
 def get_logs():
-    # Fetches recent API logs, skipping every second log (just to reduce clutter)
+    # Fetches a page of the most recent per-minute endpoint usage from the rollup table
+    try:
+        limit, before_id = page_params(request.args, default_limit=25)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, endpoint, timestamp FROM (
-            SELECT id, endpoint, timestamp, ROW_NUMBER() OVER (ORDER BY timestamp DESC) AS rn
-            FROM api_logs
-        ) WHERE rn % 2 = 1 LIMIT 25
-    """)
+    cursor.execute(f"""
+        SELECT id, minute AS timestamp, endpoint, request_count, total_ms / request_count AS avg_ms, max_ms,
+               {", ".join(BUCKET_COLUMNS)}
+        FROM api_usage_rollup WHERE id < ? ORDER BY id DESC LIMIT ?
+    """, (before_id, limit))
     logs = cursor.fetchall()
     conn.close()
     return jsonify([dict(log) for log in logs]), 200
 
 @app.route("/sensitive_logs", methods=["GET"])
 def get_sensitive_logs():
-    # Fetches all logs related to sensitive data detections
+    # Fetches a page of the logs related to sensitive data detections (newest first)
+    try:
+        limit, before_id = page_params(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM sensitive_data_logs ORDER BY timestamp DESC")
+    cursor.execute("SELECT * FROM sensitive_data_logs WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit))
     logs = cursor.fetchall()
     conn.close()
     return jsonify([dict(log) for log in logs]), 200
 
+def feed_response(feed):
+    """
+       Server-sent events with the rows added after ?after_id= (or the Last-Event-ID of a reconnecting
+       browser), oldest first, as "data: [rows]" events; ": keep-alive" comments are sent while idle.
+       """
+    after_id = request.headers.get("Last-Event-ID") or request.args.get("after_id")
+    try:
+        after_id = int(after_id) if after_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid after_id"}), 400
+
+    def generate():
+        for rows in feed.subscribe(after_id):
+            if rows:
+                yield sse_event(rows, event_id=rows[-1]["id"])
+            else:
+                yield ": keep-alive\n\n"
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/queries/stream", methods=["GET"])
+def stream_queries():
+    # Pushes new queries to the Query Monitoring page as they are saved
+    return feed_response(queries_feed)
+
+@app.route("/sensitive_logs/stream", methods=["GET"])
+def stream_sensitive_logs():
+    # Pushes new detection logs to the Sensitive Data Logs page as they are written
+    return feed_response(sensitive_logs_feed)
+
 @app.route("/performance", methods=["GET"])
 def get_performance_metrics():
     """
-        Compute accuracy, precision, recall, and F1-score of the sensitive data detection models
-        based on historical logs in the sensitive_data_logs table.
+        Accuracy, precision, recall, and F1-score of the sensitive data detection models.
+        By default they come from the running confusion counters in model_confusion, so the cost doesn't
+        grow with sensitive_data_logs. Optional query parameters are computed with one SQL aggregate instead:
+        - since / until: ISO timestamps bounding the logs considered (UTC unless they carry an offset)
+        - threshold: score above which a LABEL_1 prediction counts as sensitive
     """
+    try:
+        threshold = float(request.args.get("threshold", SENSITIVE_THRESHOLD))
+        bounds = {name: parse_db_timestamp(request.args[name]) for name in ("since", "until") if request.args.get(name)}
+    except ValueError:
+        return jsonify({"error": "Invalid threshold or time window"}), 400
+    if not 0 <= threshold <= 1:
+        return jsonify({"error": "Threshold must be between 0 and 1"}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT bert_prediction, finbert_prediction, zero_shot_prediction, is_sensitive FROM sensitive_data_logs")
-    logs = cursor.fetchall()
+    if bounds or threshold != SENSITIVE_THRESHOLD:
+        conditions = [f"timestamp {'>=' if name == 'since' else '<'} :{name}" for name in bounds]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(confusion_counts_sql(where), {"threshold": threshold, **bounds})
+        row = cursor.fetchone()
+        total = row["total"]
+        counts = {model: [row[f"{model}_{cell}"] for cell in CONFUSION_CELLS] for model in PREDICTION_MODELS}
+    else:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM sensitive_data_logs)")
+        total = cursor.fetchone()[0]
+        cursor.execute("SELECT model, tp, fp, tn, fn FROM model_confusion")
+        counts = {row["model"]: [row[cell] for cell in CONFUSION_CELLS] for row in cursor.fetchall()}
     conn.close()
 
-    if not logs:
+    if not total:
         return jsonify({"error": "No sensitive data logs available"}), 404
 
-    y_true = [log["is_sensitive"] for log in logs]
-
-    bert_preds = [1 if "LABEL_1" in log["bert_prediction"] and float(log["bert_prediction"].split("(")[1].split(")")[0]) > 0.7 else 0 for log in logs]
-    finbert_preds = [1 if "LABEL_1" in log["finbert_prediction"] and float(log["finbert_prediction"].split("(")[1].split(")")[0]) > 0.7 else 0 for log in logs]
-    zero_shot_preds = [1 if "LABEL_1" in log["zero_shot_prediction"] and float(log["zero_shot_prediction"].split("(")[1].split(")")[0]) > 0.7 else 0 for log in logs]
-
-    # Computes standard classification metrics
-    def compute_metrics(y_true, y_pred):
-        accuracy = accuracy_score(y_true, y_pred)
-        precision = precision_score(y_true, y_pred, zero_division=0)
-        recall = recall_score(y_true, y_pred, zero_division=0)
-        f1 = f1_score(y_true, y_pred, zero_division=0)
-        return {"accuracy": accuracy, "precision": precision, "recall": recall, "f1_score": f1}
-
     metrics = {
-        "BERT": compute_metrics(y_true, bert_preds),
-        "FinBERT": compute_metrics(y_true, finbert_preds),
-        "Zero-shot": compute_metrics(y_true, zero_shot_preds)
+        "BERT": metrics_from_counts(*counts["bert"]),
+        "FinBERT": metrics_from_counts(*counts["finbert"]),
+        "Zero-shot": metrics_from_counts(*counts["zero_shot"])
     }
 
     return jsonify(metrics), 200
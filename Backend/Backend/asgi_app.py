@@ -0,0 +1,152 @@
+"""
+   Asyncio serving path for the backend. /chat is handled by an async Quart app, every other
+   route is served by the existing Flask app through an ASGI adapter:
+
+       hypercorn asgi_app:application --bind 127.0.0.1:5000
+
+   - The LLM call uses the async OpenAI client with a pooled HTTP connection and timeouts
+   - Model inference and file scanning run in a thread pool executor
+   - Audit/chat logging only enqueues rows for the app's batched log writer
+   - The Flask routes run on a pool of FLASK_THREADS threads; each open SSE stream holds one
+   Set OPENAI_BASE_URL (e.g. to fake_openai.py) to test without the real API.
+   """
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import openai
+from a2wsgi import WSGIMiddleware
+from openai import AsyncOpenAI
+from quart import Quart, g, request, jsonify
+from werkzeug.utils import secure_filename
+
+import app as core
+
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "16"))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "200"))
+FLASK_THREADS = int(os.environ.get("FLASK_THREADS", "32"))
+
+asgi = Quart(__name__)
+
+# Inference blocks on the batchers, so it runs in threads
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+openai_client = None
+
+
+@asgi.before_serving
+async def startup():
+    # The HTTP pool is bound to the running event loop, so it is created at startup
+    global openai_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0),
+    )
+    openai_client = AsyncOpenAI(api_key=core.OPENAI_API_KEY, base_url=core.OPENAI_BASE_URL,
+                                timeout=OPENAI_TIMEOUT, max_retries=1, http_client=http_client)
+
+
+@asgi.after_serving
+async def shutdown():
+    # Lets queued log writes finish before the process exits
+    core.usage_aggregator.flush()
+    await asyncio.get_running_loop().run_in_executor(None, core.log_writer.flush)
+    core.db_pool.close_all()
+    await openai_client.close()
+
+
+@asgi.before_request
+async def before_request():
+    g.request_started = time.perf_counter()
+
+
+@asgi.teardown_request
+async def record_api_usage(exception=None):
+    started = g.pop("request_started", None)
+    if started is not None and request.method != "OPTIONS":
+        elapsed = time.perf_counter() - started
+        core.usage_aggregator.record(request.path, elapsed * 1000)
+        core.request_seconds.observe(elapsed, request.endpoint or "unmatched")
+
+
+@asgi.after_request
+async def add_cors_headers(response):
+    # Mirrors flask_cors' supports_credentials=True behaviour for the async routes
+    origin = request.headers.get("Origin")
+    if origin:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Vary"] = "Origin"
+        if request.method == "OPTIONS":
+            response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+            response.headers["Access-Control-Allow-Headers"] = request.headers.get("Access-Control-Request-Headers", "*")
+    return response
+
+
+@asgi.route("/chat", methods=["POST"])
+async def chat():
+    """
+       Async version of the /chat endpoint with the same request and response format.
+       """
+    form = await request.form
+    files = await request.files
+    user_id = form.get("user_id")
+    message = form.get("message")
+    file = files.get("file")
+    loop = asyncio.get_running_loop()
+
+    # The message and the file are scanned concurrently
+    file_scan = None
+    if file:
+        filename = secure_filename(file.filename)
+        filepath = os.path.join(core.UPLOAD_FOLDER, filename)
+        with core.stage_seconds.time("file_save"):
+            await file.save(filepath)
+        file_scan = loop.run_in_executor(inference_executor, core.scan_upload, filepath, filename)
+    message_result = await loop.run_in_executor(inference_executor, core.classify_message, message)
+    core.log_detection(message_result, message, user_id)
+
+    is_sensitive_file = False
+    file_content = None
+    file_findings = []
+    if file_scan is not None:
+        scanned = await file_scan
+        core.log_detection(scanned["result"], f"File {filename}: {scanned['evidence']}", user_id)
+        is_sensitive_file = scanned["result"]["is_sensitive"]
+        file_content = scanned["prompt_text"]
+        file_findings = scanned["findings"]
+
+    if message_result["is_sensitive"] or is_sensitive_file:
+        chat_response = core.SENSITIVE_RESPONSE
+    else:
+        prompt = message_result["redacted_message"]
+        if file_content:
+            prompt += f"\n\nFile Content:\n{file_content}"
+        try:
+            with core.stage_seconds.time("openai"):
+                response = await openai_client.chat.completions.create(model=core.OPENAI_MODEL,
+                                                                       messages=core.chat_messages(prompt))
+        except openai.APITimeoutError:
+            return jsonify({"error": "The language model did not respond in time"}), 504
+        chat_response = response.choices[0].message.content
+
+    core.save_chat_history(user_id, message, chat_response)
+    if file_findings:
+        return jsonify({"response": chat_response, "file_findings": file_findings})
+    return jsonify({"response": chat_response})
+
+
+ASYNC_PATHS = {"/chat"}
+# Flask routes run in their own thread pool, so a long-lived response (the admin SSE feeds) only holds one of
+# its threads instead of blocking every other Flask route
+flask_application = WSGIMiddleware(core.app, workers=FLASK_THREADS)
+
+
+async def application(scope, receive, send):
+    # Routes the async paths (and lifespan events) to Quart, everything else to the Flask app
+    if scope["type"] == "lifespan" or scope.get("path") in ASYNC_PATHS:
+        await asgi(scope, receive, send)
+    else:
+        await flask_application(scope, receive, send)
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+from lazy_thread import LazyThread
+
+
+class MicroBatcher:
+    """
+       Coalesces single-message calls from concurrent requests into batches:
+       - Callers block on predict() while a worker thread gathers messages
+       - A batch is run once max_batch_size messages arrive or max_wait_ms passes
+       - Each caller gets back its own result, exactly as if the pipeline ran alone
+       - `observer(batch_size, seconds)`, when set, is called after every forward pass (for /metrics)
+       """
+
+    def __init__(self, classifier, max_batch_size=16, max_wait_ms=5, name="classifier"):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.observer = None
+        self._queue = Queue()
+        self._worker = LazyThread(self._run, f"batcher-{name}", on_fork=self._reset_queue)
+
+    def _reset_queue(self):
+        self._queue = Queue()
+
+    def submit(self, text):
+        # Queues one message and returns a Future holding its classification result
+        self._worker.ensure()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def predict(self, text):
+        # Classifies one message, blocking until its batch has been processed
+        return self.submit(text).result()
+
+    def predict_many(self, texts):
+        # Classifies a list of messages; they are coalesced with any concurrent traffic
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _collect_batch(self):
+        # Waits for the first message, then keeps gathering until the batch is full or the window closes
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            started = time.perf_counter()
+            try:
+                # The pipeline pads each batch to its longest message
+                results = self.classifier(texts, batch_size=len(texts), truncation=True)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            if self.observer is not None:
+                self.observer(len(texts), time.perf_counter() - started)
+            for (_, future), result in zip(batch, results):
+                # Pipelines return a list per input when top_k is set, a dict otherwise
+                future.set_result(result[0] if isinstance(result, list) else result)
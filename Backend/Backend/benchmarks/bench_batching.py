@@ -0,0 +1,95 @@
+"""
+   Compares per-message inference against micro-batched inference under concurrent load.
+   Run from Backend/Backend so the fine-tuned model directories resolve:
+
+       python benchmarks/bench_batching.py --model ./bert_finetuned --concurrency 32 --requests 512
+
+   The table is saved to benchmarks/results/bench_batching-<commit>.json for benchmarks/results.py to compare.
+   """
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transformers import pipeline
+from batching import MicroBatcher
+from results import save_results
+
+SAMPLE_MESSAGES = [
+    "Customer account number: 123456789",
+    "Upcoming board meeting scheduled",
+    "Credit card number: 4111 1111 1111 1111",
+    "Please share the quarterly budget projections with the finance team before Friday",
+    "User email: john.doe@example.com",
+    "Meeting notes are attached",
+    "Transfer $2500 to account 998877665544 before the end of the day",
+    "Training session next Monday",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(predict, concurrency, total_requests):
+    # Fires total_requests single-message calls from `concurrency` threads and records latencies
+    latencies = []
+
+    def one_call(i):
+        start = time.perf_counter()
+        predict(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_call, range(total_requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching throughput/latency benchmark")
+    parser.add_argument("--model", default="./bert_finetuned")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    classifier = pipeline("text-classification", model=args.model, tokenizer=args.model)
+    classifier(SAMPLE_MESSAGES)  # Warm-up
+
+    results = [("unbatched", "-", "-", run_load(lambda text: classifier(text)[0], args.concurrency, args.requests))]
+    for max_batch_size in args.max_batch_size:
+        for max_wait_ms in args.max_wait_ms:
+            batcher = MicroBatcher(classifier, max_batch_size, max_wait_ms)
+            results.append(("batched", max_batch_size, max_wait_ms,
+                            run_load(batcher.predict, args.concurrency, args.requests)))
+
+    print(f"{'mode':<10} {'batch':>6} {'wait_ms':>8} {'req/s':>9} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+    for mode, max_batch_size, max_wait_ms, stats in results:
+        print(f"{mode:<10} {max_batch_size!s:>6} {max_wait_ms!s:>8} {stats['throughput_rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+    if not args.no_save:
+        saved = {mode if mode == "unbatched" else f"batched_{max_batch_size}_{max_wait_ms:g}ms": stats
+                 for mode, max_batch_size, max_wait_ms, stats in results}
+        config = {key: value for key, value in vars(args).items() if key != "no_save"}
+        print("Saved", save_results("bench_batching", config, saved))
+
+
+if __name__ == "__main__":
+    main()
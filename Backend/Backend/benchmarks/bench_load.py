@@ -0,0 +1,218 @@
+"""
+   Concurrent load generator for the HTTP API. Starts the app with stubbed models (stub_model.py) and the local
+   fake OpenAI server (fake_openai.py) on a scratch database, then drives a weighted mix of /chat, /history,
+   /sensitive_logs and /performance. Run from Backend/Backend:
+
+       python benchmarks/bench_load.py --concurrency 32 --duration 60
+       python benchmarks/bench_load.py --mix chat=6 history=2 sensitive_logs=1 performance=1 --workers 4
+       python benchmarks/bench_load.py --server hypercorn --backend onnx --stub-item-ms 0
+
+   Reports throughput, p50/p95/p99 per endpoint and the summed PSS/RSS of the server processes (peak and at
+   the end), and saves them to benchmarks/results/bench_load-<commit>.json for benchmarks/results.py to compare.
+   """
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_workers import memory_mb, process_tree, wait_until_ready
+from corpus import build_corpus
+from fake_openai import serve
+from results import latency_summary, save_results
+
+ENDPOINTS = ("chat", "history", "sensitive_logs", "performance")
+
+
+def parse_mix(items):
+    # ["chat=6", "history=2"] -> {"chat": 6.0, "history": 2.0}
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(endpoint, base_url, rng, messages, users):
+    # A urllib Request for one call to `endpoint` with randomized (but seeded) parameters
+    user_id = str(rng.randint(1, users))
+    if endpoint == "chat":
+        body = urllib.parse.urlencode({"user_id": user_id, "message": rng.choice(messages)}).encode()
+        return urllib.request.Request(f"{base_url}/chat", data=body)
+    if endpoint == "history":
+        body = ('{"user_id": %s, "limit": 50}' % user_id).encode()
+        return urllib.request.Request(f"{base_url}/history", data=body, headers={"Content-Type": "application/json"})
+    if endpoint == "sensitive_logs":
+        return urllib.request.Request(f"{base_url}/sensitive_logs?limit=50")
+    return urllib.request.Request(f"{base_url}/performance")
+
+
+class MemorySampler:
+    # Samples the server's summed PSS/RSS in the background and keeps the peak
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_pss_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            pss, rss = memory_mb(process_tree(self.pid))
+            self.peak_pss_mb = max(self.peak_pss_mb, pss)
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_load(base_url, mix, messages, args):
+    """
+       `concurrency` threads each send requests back to back, picking the endpoint by weight, until
+       `requests` calls were made or `duration` seconds passed. Returns {endpoint: [(seconds, ok)]}.
+       """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    remaining = [args.requests]
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    def worker(index):
+        rng = random.Random(args.seed + index)
+        while True:
+            with lock:
+                if remaining[0] <= 0 or (deadline is not None and time.monotonic() >= deadline):
+                    return
+                remaining[0] -= 1
+            endpoint = rng.choices(names, weights)[0]
+            call = build_request(endpoint, base_url, rng, messages, args.users)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(call, timeout=120) as response:
+                    response.read()
+                ok = True
+            except OSError:
+                ok = False
+            samples[endpoint].append((time.perf_counter() - start, ok))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    results = {}
+    for endpoint, calls in samples.items():
+        latencies = [seconds for seconds, ok in calls if ok]
+        results[endpoint] = {**latency_summary(latencies), "errors": len(calls) - len(latencies),
+                             "throughput_rps": len(latencies) / elapsed}
+    every = [call for calls in samples.values() for call in calls]
+    latencies = [seconds for seconds, ok in every if ok]
+    results["total"] = {**latency_summary(latencies), "errors": len(every) - len(latencies),
+                        "throughput_rps": len(latencies) / elapsed}
+    return results
+
+
+def server_command(args):
+    if args.server == "hypercorn":
+        return [sys.executable, "-m", "hypercorn", "asgi_app:application", "--bind", f"127.0.0.1:{args.port}",
+                "--workers", str(args.workers)]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test against stubbed models and a fake LLM")
+    parser.add_argument("--mix", nargs="+", default=["chat=6", "history=2", "sensitive_logs=1", "performance=1"],
+                        help="Endpoint weights as name=weight")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests (the run also stops at --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds to run; 0 means until --requests")
+    parser.add_argument("--warmup-requests", type=int, default=200,
+                        help="/chat calls before measuring, which also seed chat_history and sensitive_data_logs")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--long-fraction", type=float, default=0.05,
+                        help="Share of /chat messages taken from the synthetic long documents")
+    parser.add_argument("--server", choices=["gunicorn", "hypercorn"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--backend", default="stub", help="MODEL_BACKEND of the server")
+    parser.add_argument("--stub-batch-ms", type=float, default=10.0, help="Simulated forward pass cost per batch")
+    parser.add_argument("--stub-item-ms", type=float, default=1.0, help="Simulated forward pass cost per message")
+    parser.add_argument("--llm-delay-ms", type=float, default=200.0, help="Simulated LLM latency per request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # The message pool: every training example, plus long documents in proportion to --long-fraction
+    corpus = build_corpus(seed=args.seed)
+    messages = [example["text"] for example in corpus["short"]]
+    long_texts = [example["text"] for example in corpus["long"]]
+    if args.long_fraction > 0 and long_texts:
+        copies = max(1, round(len(messages) * args.long_fraction / (1 - args.long_fraction) / len(long_texts)))
+        messages += long_texts * copies
+
+    fake = serve(port=0, delay_ms=args.llm_delay_ms)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, MODEL_BACKEND=args.backend, STUB_BATCH_MS=str(args.stub_batch_ms),
+                   STUB_ITEM_MS=str(args.stub_item_ms), WEB_WORKERS=str(args.workers), BIND=f"127.0.0.1:{args.port}",
+                   OPENAI_BASE_URL=f"http://127.0.0.1:{fake.server_address[1]}/v1", OPENAI_API_KEY="test",
+                   DB_PATH=os.path.join(scratch, "bench.db"),
+                   LOG_FALLBACK_PATH=os.path.join(scratch, "log_fallback.jsonl"))
+        server = subprocess.Popen(server_command(args), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url, args.startup_timeout)
+            warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup_requests, "duration": 0.0})
+            run_load(base_url, {"chat": 1.0}, messages, warmup)
+            time.sleep(1)  # Lets the log writer commit the seeded rows
+
+            with MemorySampler(server.pid) as memory:
+                samples, elapsed = run_load(base_url, mix, messages, args)
+            results = summarize(samples, elapsed)
+            pss, rss = memory_mb(process_tree(server.pid))
+            results["memory"] = {"pss_mb": pss, "rss_mb": rss, "peak_pss_mb": max(memory.peak_pss_mb, pss),
+                                 "peak_rss_mb": max(memory.peak_rss_mb, rss)}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    fake.shutdown()
+
+    print(f"{'endpoint':<15} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint in [*mix, "total"]:
+        r = results[endpoint]
+        print(f"{endpoint:<15} {r['count']:>9} {r['errors']:>7} {r['throughput_rps']:>9.1f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+    memory = results["memory"]
+    print(f"memory: PSS {memory['pss_mb']:.0f} MB (peak {memory['peak_pss_mb']:.0f}), "
+          f"RSS {memory['rss_mb']:.0f} MB (peak {memory['peak_rss_mb']:.0f})")
+
+    if not args.no_save:
+        config = {key: value for key, value in vars(args).items() if key not in ("port", "no_save", "startup_timeout")}
+        print("Saved", save_results("bench_load", config, results))
+
+
+if __name__ == "__main__":
+    main()
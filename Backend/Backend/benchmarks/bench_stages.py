@@ -0,0 +1,110 @@
+"""
+   Micro-benchmarks of the detection stages behind detect_sensitive_data, in-process, over the fixed corpus
+   of benchmarks/corpus.py (the training examples plus synthetic long documents). Run from Backend/Backend:
+
+       python benchmarks/bench_stages.py --repeat 5
+       MODEL_BACKEND=stub python benchmarks/bench_stages.py --long-docs 50
+
+   The app is imported against a scratch database. Every stage runs on each corpus `--repeat` times after a
+   warm-up; the median run is reported and saved to benchmarks/results/bench_stages-<commit>.json.
+   """
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import build_corpus
+from results import peak_rss_mb, save_results
+
+
+def time_stage(run, texts, repeat, setup=None):
+    # Median and best of `repeat` timed runs over the whole text list
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run(texts)
+        durations.append(time.perf_counter() - start)
+    median = statistics.median(durations)
+    return {
+        "items": len(texts),
+        "median_s": median,
+        "min_s": min(durations),
+        "per_item_ms": median / len(texts) * 1000,
+        "items_per_second": len(texts) / median,
+    }
+
+
+def detection_stages(app):
+    # name -> (run(texts), setup before each run or None)
+    nlp = app.model_registry.get("spacy")
+
+    def detect_and_log(texts):
+        for text in texts:
+            app.detect_sensitive_data(text, 1)
+        app.log_writer.flush()
+
+    stages = {
+        "spacy": (lambda texts: list(nlp.pipe(texts, batch_size=app.SPACY_BATCH_SIZE)), None),
+        "rules": (lambda texts: [app.rule_engine.find(text) for text in texts], None),
+        "rule_stage": (app.run_rule_stages, None),
+    }
+    for batcher in app.active_batchers:
+        stages[f"model_{batcher.name}"] = (batcher.predict_many, None)
+    stages["classify_cold"] = (app.classify_messages, app.detection_cache.clear)
+    stages["classify_warm"] = (app.classify_messages, None)
+    stages["detect_sensitive_data"] = (detect_and_log, app.detection_cache.clear)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage detection micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--long-docs", type=int, default=20)
+    parser.add_argument("--long-doc-chars", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", nargs="+", help="Only run these stages")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_stages_")
+    os.environ["DB_PATH"] = os.path.join(scratch, "bench.db")
+    os.environ["LOG_FALLBACK_PATH"] = os.path.join(scratch, "log_fallback.jsonl")
+    started = time.perf_counter()
+    import app
+    startup_s = time.perf_counter() - started
+
+    corpus = build_corpus(args.long_docs, args.long_doc_chars, args.seed)
+    stages = detection_stages(app)
+    selected = args.stages or list(stages)
+
+    results = {"startup_s": startup_s}
+    print(f"{'stage':<24} {'corpus':<6} {'items':>6} {'median s':>9} {'ms/item':>9} {'items/s':>9}")
+    for name in selected:
+        run, setup = stages[name]
+        for corpus_name, examples in corpus.items():
+            texts = [example["text"] for example in examples]
+            if not texts:
+                continue
+            run(texts)  # Warm-up (also loads lazily loaded models)
+            result = time_stage(run, texts, args.repeat, setup)
+            results.setdefault(name, {})[corpus_name] = result
+            print(f"{name:<24} {corpus_name:<6} {result['items']:>6} {result['median_s']:>9.3f} "
+                  f"{result['per_item_ms']:>9.2f} {result['items_per_second']:>9.1f}")
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"peak RSS: {results['peak_rss_mb']:.0f} MB")
+
+    if not args.no_save:
+        config = {"model_backend": app.MODEL_BACKEND, "detection_mode": app.DETECTION_MODE, "repeat": args.repeat,
+                  "long_docs": args.long_docs, "long_doc_chars": args.long_doc_chars, "seed": args.seed,
+                  "stages": selected}
+        print("Saved", save_results("bench_stages", config, results))
+
+
+if __name__ == "__main__":
+    main()
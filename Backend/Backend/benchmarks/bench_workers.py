@@ -0,0 +1,148 @@
+"""
+   Requests/sec and memory of the gunicorn deployment (gunicorn.conf.py) for different worker counts.
+   Run from Backend/Backend; the LLM is replaced by fake_openai.py and a scratch database is used:
+
+       python benchmarks/bench_workers.py --workers 1 2 4 8 --concurrency 64 --requests 2000
+
+   Memory is reported as the summed PSS of the master and workers (shared pages are split between the
+   processes that map them) next to the summed RSS (which counts shared model pages once per process).
+   The table is saved to benchmarks/results/bench_workers-<commit>.json for benchmarks/results.py to compare.
+   """
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batching import SAMPLE_MESSAGES, percentile
+from fake_openai import serve
+from results import save_results
+
+
+def wait_until_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"{base_url} did not become ready within {timeout}s")
+
+
+def process_tree(pid):
+    # The gunicorn master and its workers
+    children = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    if int(stat.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except OSError:
+                continue
+    return [pid] + children
+
+
+def memory_mb(pids):
+    # Summed (PSS, RSS) in MB from /proc/<pid>/smaps_rollup (Linux only)
+    pss = rss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as rollup:
+                for line in rollup:
+                    if line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+                    elif line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+        except OSError:
+            continue
+    return pss / 1024, rss / 1024
+
+
+def run_load(base_url, concurrency, total_requests):
+    latencies = []
+    errors = []
+
+    def one_call(i):
+        body = urllib.parse.urlencode({"user_id": "1", "message": SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]}).encode()
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{base_url}/chat", data=body, timeout=120) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except OSError as e:
+            errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_call, range(total_requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else 0.0,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else 0.0,
+        "errors": len(errors),
+    }
+
+
+def bench(workers, args, fake_url, scratch):
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WEB_WORKERS=str(workers), BIND=f"127.0.0.1:{port}", OPENAI_BASE_URL=fake_url,
+               OPENAI_API_KEY="test", DB_PATH=os.path.join(scratch, f"bench_{workers}.db"),
+               LOG_FALLBACK_PATH=os.path.join(scratch, "log_fallback.jsonl"))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(base_url, args.startup_timeout)
+        run_load(base_url, args.concurrency, min(args.requests, 64))  # Warm-up
+        result = run_load(base_url, args.concurrency, args.requests)
+        result["pss_mb"], result["rss_mb"] = memory_mb(process_tree(server.pid))
+        return result
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gunicorn worker-count scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0, help="Simulated LLM latency per request")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    fake = serve(port=0, delay_ms=args.llm_delay_ms)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    fake_url = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'PSS MB':>9} {'RSS MB':>9}")
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for workers in args.workers:
+            r = results[f"workers_{workers}"] = bench(workers, args, fake_url, scratch)
+            print(f"{workers:>7} {r['throughput_rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+                  f"{r['errors']:>7} {r['pss_mb']:>9.0f} {r['rss_mb']:>9.0f}")
+    fake.shutdown()
+
+    if not args.no_save:
+        config = {key: value for key, value in vars(args).items() if key not in ("port", "no_save", "startup_timeout")}
+        print("Saved", save_results("bench_workers", config, results))
+
+
+if __name__ == "__main__":
+    main()
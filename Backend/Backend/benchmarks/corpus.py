@@ -0,0 +1,66 @@
+"""
+   Fixed corpus for the benchmarks: the labelled examples of train_models.py (read from its source, so the
+   training dependencies aren't needed) plus synthetic long documents assembled from them with a fixed seed.
+   The same arguments always give the same texts, so results from different commits are comparable.
+   """
+import ast
+import os
+import random
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Neutral sentences mixed into the long documents between the training examples
+FILLER_SENTENCES = [
+    "The quarterly planning session covered hiring, office moves and the product roadmap.",
+    "Please review the attached agenda before the meeting and add any open questions.",
+    "The team agreed to revisit the onboarding checklist once the new tooling is in place.",
+    "Facilities will replace the meeting room displays on the third floor next week.",
+    "Remember to submit your travel requests at least two weeks before departure.",
+    "The design review was moved to Thursday afternoon to accommodate the remote team.",
+]
+
+
+def load_training_data(path=os.path.join(BACKEND_DIR, "train_models.py")):
+    # The training_data literal of train_models.py as a list of {"text", "label"} dicts
+    with open(path, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "training_data"
+                                                for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"No training_data list found in {path}")
+
+
+def synthetic_document(rng, clean_texts, sensitive_texts, chars, sensitive):
+    """
+       About `chars` characters of clean examples and filler in paragraphs. A sensitive document gets one
+       sensitive example in its last quarter, the worst case for scans that stop at the first finding.
+       """
+    sentences = []
+    length = 0
+    while length < chars:
+        sentence = rng.choice(clean_texts) + "." if rng.random() < 0.5 else rng.choice(FILLER_SENTENCES)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    if sensitive:
+        position = rng.randint(len(sentences) * 3 // 4, len(sentences))
+        sentences.insert(position, rng.choice(sensitive_texts) + ".")
+    paragraphs = [" ".join(sentences[start:start + 8]) for start in range(0, len(sentences), 8)]
+    return "\n\n".join(paragraphs)
+
+
+def build_corpus(long_docs=20, long_doc_chars=20000, seed=42):
+    """
+       {"short": [...], "long": [...]} lists of {"text", "label"}: every training example once, and
+       long_docs synthetic documents of about long_doc_chars characters, half of them sensitive.
+       """
+    data = load_training_data()
+    rng = random.Random(seed)
+    clean_texts = [example["text"] for example in data if example["label"] == 0]
+    sensitive_texts = [example["text"] for example in data if example["label"] == 1]
+    long = []
+    for index in range(long_docs):
+        sensitive = index % 2 == 1
+        long.append({"text": synthetic_document(rng, clean_texts, sensitive_texts, long_doc_chars, sensitive),
+                     "label": int(sensitive)})
+    return {"short": [{"text": example["text"], "label": example["label"]} for example in data], "long": long}
@@ -0,0 +1,140 @@
+"""
+   Saving benchmark results for comparison between commits, and comparing two saved runs:
+
+       python benchmarks/results.py benchmarks/results/bench_load-1a2b3c4.json benchmarks/results/bench_load-5d6e7f8.json
+
+   Each run is written to benchmarks/results/<benchmark>-<commit>.json with the commit, the machine and the
+   configuration it ran with. The comparison exits with status 1 when a metric regressed by more than
+   --tolerance, so it can gate CI.
+   """
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Metric name suffixes where lower is better / higher is better; other numbers are shown but not judged
+LOWER_IS_BETTER = ("_ms", "_s", "_mb", "errors")
+HIGHER_IS_BETTER = ("_rps", "per_second")
+
+
+def percentile(values, pct):
+    # Linear interpolation between the closest ranks
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = pct / 100.0 * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def latency_summary(latencies):
+    # Seconds in, milliseconds out
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def peak_rss_mb():
+    # Peak RSS of this process (ru_maxrss is in KB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_revision():
+    # (short commit hash, whether the working tree has uncommitted changes)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def save_results(benchmark, config, results, directory=RESULTS_DIR):
+    commit, dirty = git_revision()
+    payload = {
+        "benchmark": benchmark,
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{benchmark}-{commit}{'-dirty' if dirty else ''}.json")
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(payload, output, indent=2, sort_keys=True)
+    return path
+
+
+def flatten(value, prefix=""):
+    # {"chat": {"p95_ms": 12.0}} -> {"chat.p95_ms": 12.0}, numbers only
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}{key}."))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix[:-1]: value}
+    return {}
+
+
+def compare(old, new, tolerance):
+    # Rows of (metric, old, new, relative change, verdict) for the metrics both runs have
+    old_metrics = flatten(old["results"])
+    new_metrics = flatten(new["results"])
+    rows = []
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[name], new_metrics[name]
+        change = (after - before) / before if before else 0.0
+        verdict = ""
+        if name.endswith(LOWER_IS_BETTER):
+            verdict = "regressed" if change > tolerance else "improved" if change < -tolerance else ""
+        elif name.endswith(HIGHER_IS_BETTER):
+            verdict = "regressed" if change < -tolerance else "improved" if change > tolerance else ""
+        rows.append((name, before, after, change, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two saved benchmark runs")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change treated as noise")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as old_file, open(args.new, encoding="utf-8") as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    if old["benchmark"] != new["benchmark"]:
+        sys.exit(f"Cannot compare {old['benchmark']} with {new['benchmark']}")
+    if old["config"] != new["config"]:
+        print("Warning: the runs used different configurations")
+
+    print(f"{old['benchmark']}: {old['commit']} -> {new['commit']}")
+    rows = compare(old, new, args.tolerance)
+    width = max((len(row[0]) for row in rows), default=6)
+    print(f"{'metric':<{width}} {'old':>12} {'new':>12} {'change':>8}")
+    for name, before, after, change, verdict in rows:
+        print(f"{name:<{width}} {before:>12.2f} {after:>12.2f} {change:>+8.1%} {verdict}")
+    if any(row[4] == "regressed" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import queue
+import sqlite3
+import threading
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+       sqlite3 connection whose close() hands it back to its pool instead of closing it,
+       so existing "conn = get_db_connection() ... conn.close()" code reuses connections unchanged.
+       """
+
+    pool = None
+
+    def close(self):
+        # Uncommitted work never leaks into the next borrower
+        if self.in_transaction:
+            self.rollback()
+        if self.pool is None or not self.pool.release(self):
+            super().close()
+
+    def close_for_real(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+       Pool of tuned SQLite connections shared by all request threads:
+       - WAL journaling so readers don't block the writer (and vice versa)
+       - synchronous=NORMAL, a larger page cache and memory-mapped reads
+       - A per-connection prepared statement cache (cached_statements)
+       - Reset automatically in a forked child, since connections must not cross fork()
+       """
+
+    def __init__(self, path, size=16, busy_timeout=5.0, cache_size_kb=16000, mmap_size=256 * 1024 * 1024,
+                 cached_statements=256):
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, factory=PooledConnection,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row # So we can access columns by name
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        # Returns False when the connection should really be closed (pool full, or it came from the parent process)
+        if self._pid != os.getpid():
+            return False
+        try:
+            self._idle.put_nowait(conn)
+            return True
+        except queue.Full:
+            return False
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close_for_real()
+            except queue.Empty:
+                return
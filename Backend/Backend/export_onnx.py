@@ -0,0 +1,120 @@
+"""
+   Exports the fine-tuned classifiers to ONNX for the app's MODEL_BACKEND=onnx / onnx-int8 modes, then
+   compares them with the PyTorch models. Run after train_models.py:
+
+       python export_onnx.py                  # export + dynamic int8 quantization + comparison report
+       python export_onnx.py --compare-only   # just rerun the comparison
+
+   Every model is written twice next to its PyTorch directory, e.g. ./bert_finetuned_onnx and
+   ./bert_finetuned_onnx_int8, together with its tokenizer so the app can load either directly.
+   """
+import argparse
+import os
+import time
+
+import pandas as pd
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer, pipeline
+
+MODEL_DIRS = {"BERT": "./bert_finetuned", "FinBERT": "./finbert_finetuned", "Zero-shot": "./zero_shot_finetuned"}
+BACKEND_SUFFIXES = {"pytorch": "", "onnx": "_onnx", "onnx-int8": "_onnx_int8"}
+SENSITIVE_THRESHOLD = 0.7
+
+
+def export_model(model_dir, quantization):
+    # Exports model_dir to ONNX, then writes a dynamically quantized (int8 weights) copy of it
+    onnx_dir = model_dir + BACKEND_SUFFIXES["onnx"]
+    int8_dir = model_dir + BACKEND_SUFFIXES["onnx-int8"]
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    model = ORTModelForSequenceClassification.from_pretrained(model_dir, export=True)
+    model.save_pretrained(onnx_dir)
+    tokenizer.save_pretrained(onnx_dir)
+
+    # Dynamic quantization: weights are stored as int8, activations are quantized on the fly per batch
+    quantizer = ORTQuantizer.from_pretrained(onnx_dir)
+    qconfig = getattr(AutoQuantizationConfig, quantization)(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+    tokenizer.save_pretrained(int8_dir)
+    print(f"Exported {model_dir} to {onnx_dir} and {int8_dir}")
+
+
+def load_backend(model_dir, backend):
+    # Same pipeline the app builds for each MODEL_BACKEND, so outputs are compared like for like
+    path = model_dir + BACKEND_SUFFIXES[backend]
+    if backend == "pytorch":
+        return pipeline("text-classification", model=path, tokenizer=path)
+    model = ORTModelForSequenceClassification.from_pretrained(path)
+    return pipeline("text-classification", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+def time_calls(classifier, texts, batch_size, repeats):
+    # Mean milliseconds per message over `repeats` passes, after one warm-up pass
+    classifier(texts[:batch_size], batch_size=batch_size, truncation=True)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for start in range(0, len(texts), batch_size):
+            classifier(texts[start:start + batch_size], batch_size=batch_size, truncation=True)
+    return (time.perf_counter() - started) * 1000 / (repeats * len(texts))
+
+
+def compare(samples, repeats, batch_size, report_path):
+    """
+       Accuracy and latency of every backend on the labelled samples. Agreement and score drift are
+       measured against the PyTorch model, since the ONNX backends are meant to be drop-in replacements.
+       """
+    texts = [sample["text"] for sample in samples]
+    labels = [sample["label"] for sample in samples]
+    rows = []
+    for name, model_dir in MODEL_DIRS.items():
+        reference = None
+        for backend in BACKEND_SUFFIXES:
+            if not os.path.isdir(model_dir + BACKEND_SUFFIXES[backend]):
+                print(f"Skipping {name} ({backend}): {model_dir + BACKEND_SUFFIXES[backend]} not found")
+                continue
+            classifier = load_backend(model_dir, backend)
+            outputs = classifier(texts, batch_size=batch_size, truncation=True)
+            predicted = [int(out["label"] == "LABEL_1" and out["score"] > SENSITIVE_THRESHOLD) for out in outputs]
+            if backend == "pytorch":
+                reference = outputs
+            row = {
+                "model": name,
+                "backend": backend,
+                "accuracy": sum(p == y for p, y in zip(predicted, labels)) / len(labels),
+                "ms_per_message_batch_1": time_calls(classifier, texts, 1, repeats),
+                f"ms_per_message_batch_{batch_size}": time_calls(classifier, texts, batch_size, repeats),
+                "size_mb": directory_size_mb(model_dir + BACKEND_SUFFIXES[backend]),
+            }
+            if reference is not None:
+                row["label_agreement"] = sum(a["label"] == b["label"] for a, b in zip(outputs, reference)) / len(texts)
+                row["max_score_diff"] = max((abs(a["score"] - b["score"])
+                                             for a, b in zip(outputs, reference) if a["label"] == b["label"]), default=0.0)
+            rows.append(row)
+    df = pd.DataFrame(rows)
+    print(df.to_markdown(index=False))
+    df.to_csv(report_path, index=False)
+    print(f"Comparison report written to {report_path}")
+
+
+def directory_size_mb(path):
+    return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files) / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the fine-tuned classifiers to ONNX and int8 ONNX")
+    parser.add_argument("--quantization", default="avx2", choices=["avx2", "avx512", "avx512_vnni", "arm64"],
+                        help="Target instruction set for the int8 kernels")
+    parser.add_argument("--compare-only", action="store_true", help="Skip the export and only write the report")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--report", default="onnx_comparison.csv")
+    args = parser.parse_args()
+
+    if not args.compare_only:
+        for model_dir in MODEL_DIRS.values():
+            export_model(model_dir, args.quantization)
+
+    # The labelled examples the models were fine-tuned on; importing train_models doesn't start training
+    from train_models import training_data
+    compare(training_data, args.repeats, args.batch_size, args.report)
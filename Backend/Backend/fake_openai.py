@@ -0,0 +1,98 @@
+"""
+   Local stand-in for the OpenAI chat completions API, for tests and load runs without network access:
+
+       python fake_openai.py --port 8001 --delay-ms 300
+       OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test python app.py
+   """
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_reply(messages):
+    # Echoes the start of the last user message so callers can tell responses apart
+    question = messages[-1]["content"] if messages else ""
+    return f"This is a stubbed response to: {question[:200]}"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    delay_seconds = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if payload.get("stream"):
+            self._stream(payload)
+            return
+        time.sleep(self.delay_seconds)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": fake_reply(payload.get("messages", []))},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _stream(self, payload):
+        # Sends the reply word by word as chat.completion.chunk events, spreading the delay over the tokens
+        words = fake_reply(payload.get("messages", [])).split(" ")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for index, word in enumerate(words):
+            time.sleep(self.delay_seconds / len(words))
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-3.5-turbo"),
+                "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word},
+                             "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def serve(host="127.0.0.1", port=8001, delay_ms=0.0):
+    FakeOpenAIHandler.delay_seconds = delay_ms / 1000.0
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Simulated generation time per request")
+    args = parser.parse_args()
+    print(f"Fake OpenAI API listening on http://{args.host}:{args.port}/v1")
+    serve(args.host, args.port, args.delay_ms).serve_forever()
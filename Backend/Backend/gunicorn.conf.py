@@ -0,0 +1,46 @@
+"""
+   Multi-process serving with one copy of the models, run from Backend/Backend:
+
+       gunicorn -c gunicorn.conf.py app:app
+
+   The app (spaCy, the classifiers, the compiled rules) is imported once in the master and the workers
+   are forked from it, so the model weights are shared copy-on-write instead of loaded per worker.
+   Everything with threads or connections (batchers, log writer, DB pool, model registry) restarts
+   itself in each worker.
+   """
+import gc
+import multiprocessing
+import os
+
+# Models must be fully loaded before forking; background/lazy loading would load them once per worker
+os.environ["MODEL_LOADING"] = "eager"
+
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("WEB_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.environ.get("WEB_THREADS", "8"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked. Freezing moves every
+    # object into the permanent generation, so the workers' garbage collector never writes to (and
+    # un-shares) the pages holding the models
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Each worker gets an even share of the cores for torch, unless INTRA_OP_THREADS already pinned it
+    if not os.environ.get("INTRA_OP_THREADS"):
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
+
+
+def worker_exit(server, worker):
+    # Writes the worker's queued audit rows and usage counters, then closes its connections, before it goes away
+    import app
+    app.usage_aggregator.flush()
+    app.log_writer.flush()
+    app.db_pool.close_all()
@@ -0,0 +1,35 @@
+import os
+import threading
+
+
+class LazyThread:
+    """
+       A daemon thread started on first use, shared by the background workers (batchers, log writer, live feeds):
+       - ensure() starts the thread unless it is already running in this process
+       - Threads don't survive a fork, so a forked worker process starts its own on first use; `on_fork`
+         is called just before that to replace the queues and conditions inherited from the parent
+       """
+
+    def __init__(self, target, name, on_fork=None):
+        self.target = target
+        self.name = name
+        self.on_fork = on_fork
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def started(self):
+        # Whether the thread was started in this process (it may have died since)
+        return self._thread is not None and self._pid == os.getpid()
+
+    def ensure(self):
+        if self.started() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self.started() and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid() and self.on_fork is not None:
+                self.on_fork()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
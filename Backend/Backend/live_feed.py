@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+
+from lazy_thread import LazyThread
+
+
+class LiveFeed:
+    """
+       Fans out newly written rows of one table to any number of server-sent-event subscribers:
+       - One reader thread per process runs "... WHERE id > ?" on behalf of all subscribers, and only
+         while at least one is connected, so database load doesn't grow with the number of viewers
+       - notify() (called by the log writer after each commit) wakes the reader right away; otherwise it
+         checks every poll_interval seconds, which also picks up rows written by other worker processes
+       - The latest rows are kept in a bounded buffer; each subscriber resumes from its own last-seen id
+       """
+
+    def __init__(self, connect, table, columns="*", buffer_size=500, poll_interval=2.0):
+        self.connect = connect
+        self.table = table
+        self.query = f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self._rows = deque(maxlen=buffer_size)
+        self._last_id = None
+        self._subscribers = 0
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._reader = LazyThread(self._run, f"live-feed-{table}", on_fork=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The parent's subscribers and their condition don't exist in a forked process
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._subscribers = 0
+
+    def notify(self):
+        self._wake.set()
+
+    def _fetch(self, after_id, limit):
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(self.query, (after_id, limit)).fetchall()]
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._subscribers == 0:
+                    self._condition.wait()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                rows = self._fetch(self._last_id, self.buffer_size)
+            except Exception as e:
+                print(f"Error reading live feed {self.table}:", str(e))
+                time.sleep(self.poll_interval)
+                continue
+            with self._condition:
+                # A subscriber arriving on an idle feed may have moved _last_id past this fetch
+                rows = [row for row in rows if row["id"] > self._last_id]
+                if rows:
+                    self._rows.extend(rows)
+                    self._last_id = rows[-1]["id"]
+                    self._condition.notify_all()
+
+    def _rows_after(self, after_id):
+        # Buffered rows newer than after_id, or None when the buffer may not reach back that far
+        if after_id >= self._last_id:
+            return []
+        if not self._rows or self._rows[0]["id"] > after_id + 1:
+            return None
+        return [row for row in self._rows if row["id"] > after_id]
+
+    def subscribe(self, after_id=None, heartbeat=15.0):
+        """
+           Generator of row lists newer than after_id (None means "from now on"), oldest first.
+           Yields an empty list every `heartbeat` seconds without news, so dead connections get noticed.
+           """
+        self._reader.ensure()
+        with self._condition:
+            if self._subscribers == 0:
+                # The reader stops while nobody listens, so an idle feed restarts from the newest row instead of
+                # paging through everything written meanwhile; explicit after_ids older than that read the database
+                self._last_id = self._fetch_max_id()
+                self._rows.clear()
+            if after_id is None:
+                after_id = self._last_id
+            self._subscribers += 1
+            self._condition.notify_all()
+        try:
+            while True:
+                with self._condition:
+                    rows = self._rows_after(after_id)
+                    if rows == []:
+                        self._condition.wait(heartbeat)
+                        rows = self._rows_after(after_id)
+                if rows is None:
+                    # The subscriber is behind the buffer: it catches up from the database directly
+                    rows = self._fetch(after_id, self.buffer_size)
+                after_id = rows[-1]["id"] if rows else max(after_id, self._last_id)
+                yield rows
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+    def _fetch_max_id(self):
+        conn = self.connect()
+        try:
+            return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}").fetchone()[0]
+        finally:
+            conn.close()
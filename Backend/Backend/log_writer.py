@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from queue import Queue, Empty, Full
+
+from lazy_thread import LazyThread
+
+
+class BatchedLogWriter:
+    """
+       Background writer for audit rows (sensitive_data_logs, chat_history, api_usage_rollup):
+       - write() only enqueues the row, so logging costs microseconds on the request path;
+         write_many() enqueues a group of rows that is always committed in the same transaction
+       - A worker thread groups queued rows by statement and writes them with executemany,
+         one transaction per flush, every flush_interval seconds or batch_size rows
+       - When the bounded queue is full the caller writes synchronously instead of dropping rows
+       - When a flush fails, its statements are retried one transaction each (and rejected rows one by one),
+         so only the rows that really fail are appended to a JSONL fallback file, replayed on the next start
+       - flush() waits until everything queued so far is committed; close() does that at shutdown
+       - Callables in `listeners` are called after every commit (e.g. to wake live feeds)
+       - `flush_observer(rows, seconds)`, when set, is called after every commit with its duration
+       """
+
+    def __init__(self, connect, max_queue=10000, batch_size=500, flush_interval=0.2,
+                 fallback_path="log_fallback.jsonl"):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fallback_path = fallback_path
+        self.max_queue = max_queue
+        self.written = 0
+        self.failed = 0
+        self.listeners = []
+        self.flush_observer = None
+        self._queue = Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker = LazyThread(self._run, "log-writer", on_fork=self._reset_queue)
+
+    def _reset_queue(self):
+        self._queue = Queue(maxsize=self.max_queue)
+
+    def write(self, sql, params):
+        self._worker.ensure()
+        try:
+            self._queue.put_nowait((sql, tuple(params)))
+        except Full:
+            # Backpressure: the request pays for its own write rather than losing the row
+            self._write_rows([[(sql, tuple(params))]])
+
+    def write_many(self, sql, params_list):
+        # Queued as a single entry, so the worker never splits the group across two flushes
+        rows = [(sql, tuple(params)) for params in params_list]
+        if not rows:
+            return
+        self._worker.ensure()
+        try:
+            self._queue.put_nowait((None, rows))
+        except Full:
+            self._write_rows([rows])
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=10.0):
+        # Blocks until every row queued before this call has been written (or timeout passes)
+        if not self._worker.started():
+            return True
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def close(self):
+        self.flush()
+
+    def _collect_batch(self):
+        """
+           Waits up to flush_interval for rows, then drains whatever else is queued up to batch_size.
+           Returns the rows as units (a single row, or a write_many() group) and the flush() markers.
+           """
+        units = []
+        rows = 0
+        markers = []
+        deadline = time.monotonic() + self.flush_interval
+        while rows < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    sql, params = self._queue.get(timeout=remaining)
+                else:
+                    sql, params = self._queue.get_nowait()
+            except Empty:
+                break
+            if sql is None and isinstance(params, list):
+                # A write_many() group
+                units.append(params)
+                rows += len(params)
+                continue
+            if sql is None:
+                # A flush() marker: write everything up to here right away
+                markers.append(params)
+                break
+            units.append([(sql, params)])
+            rows += 1
+        return units, markers
+
+    def _run(self):
+        while True:
+            units, markers = self._collect_batch()
+            if units:
+                self._write_rows(units)
+            for marker in markers:
+                marker.set()
+
+    def _commit(self, rows):
+        # One transaction, rows grouped per statement so each group is a single executemany; returns the error or None
+        grouped = {}
+        for sql, params in rows:
+            grouped.setdefault(sql, []).append(params)
+        conn = None
+        try:
+            conn = self.connect()
+            for sql, params_list in grouped.items():
+                conn.executemany(sql, params_list)
+            conn.commit()
+            return None
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            return e
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit_separately(self, units):
+        """
+           After a failed flush: each statement is retried in its own transaction. When a statement's rows are
+           rejected (constraint or binding errors) its units are retried one by one; other errors (locked
+           database, missing table) fail the whole statement. Returns (committed rows, failed rows).
+           """
+        statements = {}
+        for unit in units:
+            statements.setdefault(unit[0][0], []).append(unit)
+        committed = []
+        failed = []
+        for statement_units in statements.values():
+            rows = [row for unit in statement_units for row in unit]
+            error = self._commit(rows)
+            if error is None:
+                committed += rows
+            elif len(statement_units) > 1 and isinstance(error, (sqlite3.IntegrityError, sqlite3.InterfaceError,
+                                                                  sqlite3.ProgrammingError)):
+                for unit in statement_units:
+                    (committed if self._commit(unit) is None else failed).extend(unit)
+            else:
+                print("Error writing log rows:", str(error))
+                failed += rows
+        return committed, failed
+
+    def _write_rows(self, units):
+        # `units` are lists of rows that must be committed together: a single row, or a write_many() group
+        rows = [row for unit in units for row in unit]
+        started = time.perf_counter()
+        error = self._commit(rows)
+        if error is None:
+            committed, failed = rows, []
+        else:
+            print("Error writing log batch, retrying it statement by statement:", str(error))
+            committed, failed = self._commit_separately(units)
+        self.written += len(committed)
+        if failed:
+            self.failed += len(failed)
+            print(f"Saving {len(failed)} log rows to the fallback file")
+            self._save_fallback(failed)
+        if not committed:
+            return
+        # The rows are committed by now, so a failing callback must not send them to the fallback file
+        try:
+            if self.flush_observer is not None:
+                self.flush_observer(len(committed), time.perf_counter() - started)
+            for listener in self.listeners:
+                listener()
+        except Exception as e:
+            print("Error in a log writer callback:", str(e))
+
+    def _save_fallback(self, rows):
+        with self._lock:
+            with open(self.fallback_path, "a", encoding="utf-8") as fallback:
+                for sql, params in rows:
+                    fallback.write(json.dumps({"sql": sql, "params": list(params)}) + "\n")
+
+    def replay_fallback(self):
+        # Writes the rows a previous run couldn't; called once at startup
+        replaying_path = self.fallback_path + ".replaying"
+        try:
+            # Processes starting together race for the file: only the one that moves it replays it
+            os.replace(self.fallback_path, replaying_path)
+        except FileNotFoundError:
+            return 0
+        rows = []
+        with open(replaying_path, encoding="utf-8") as fallback:
+            for line in fallback:
+                if line.strip():
+                    row = json.loads(line)
+                    rows.append((row["sql"], tuple(row["params"])))
+        if rows:
+            self._write_rows([[row] for row in rows])
+        os.remove(replaying_path)
+        return len(rows)
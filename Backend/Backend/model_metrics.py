@@ -0,0 +1,75 @@
+# Models whose predictions are logged in sensitive_data_logs, as "<model>_label" / "<model>_score" columns
+PREDICTION_MODELS = ("bert", "finbert", "zero_shot")
+CONFUSION_CELLS = ("tp", "fp", "tn", "fn")
+
+
+def confusion_table_sql():
+    return '''CREATE TABLE IF NOT EXISTS model_confusion (
+                        model TEXT PRIMARY KEY, threshold REAL,
+                        tp INTEGER DEFAULT 0, fp INTEGER DEFAULT 0, tn INTEGER DEFAULT 0, fn INTEGER DEFAULT 0)'''
+
+
+def backfill_sql(model):
+    # Parses the structured columns out of legacy "LABEL_1 (0.93)" strings
+    column = f"{model}_prediction"
+    return f'''UPDATE sensitive_data_logs SET
+                   {model}_label = CASE WHEN {column} LIKE 'LABEL_1 %' THEN 1 ELSE 0 END,
+                   {model}_score = CAST(substr({column}, instr({column}, '(') + 1,
+                                        instr({column}, ')') - instr({column}, '(') - 1) AS REAL)
+               WHERE {model}_label IS NULL AND {column} LIKE 'LABEL_% (%)\''''
+
+
+def _cell_expressions(model, threshold, row="", actual="is_sensitive"):
+    # 0/1 expressions for each confusion matrix cell; rows where the model was skipped count nowhere
+    predicted = f"({row}{model}_label = 1 AND {row}{model}_score > {threshold})"
+    ran = f"{row}{model}_label IS NOT NULL"
+    return {
+        "tp": f"({ran} AND {predicted} AND {row}{actual} = 1)",
+        "fp": f"({ran} AND {predicted} AND {row}{actual} = 0)",
+        "tn": f"({ran} AND NOT {predicted} AND {row}{actual} = 0)",
+        "fn": f"({ran} AND NOT {predicted} AND {row}{actual} = 1)",
+    }
+
+
+def confusion_trigger_sql():
+    # Keeps model_confusion current as rows are inserted, inside the same transaction as the insert
+    updates = []
+    for model in PREDICTION_MODELS:
+        cells = _cell_expressions(model, "threshold", row="NEW.")
+        assignments = ", ".join(f"{cell} = {cell} + {cells[cell]}" for cell in CONFUSION_CELLS)
+        updates.append(f"UPDATE model_confusion SET {assignments} "
+                       f"WHERE model = '{model}' AND NEW.{model}_label IS NOT NULL;")
+    body = "\n                   ".join(updates)
+    return f'''CREATE TRIGGER IF NOT EXISTS sensitive_data_logs_confusion AFTER INSERT ON sensitive_data_logs
+               BEGIN
+                   {body}
+               END'''
+
+
+def confusion_counts_sql(where=""):
+    # One pass over sensitive_data_logs counting every model's cells at :threshold; columns are "<model>_<cell>"
+    columns = ["COUNT(*) AS total"]
+    for model in PREDICTION_MODELS:
+        cells = _cell_expressions(model, ":threshold")
+        columns += [f"COALESCE(SUM{cells[cell]}, 0) AS {model}_{cell}" for cell in CONFUSION_CELLS]
+    return f"SELECT {', '.join(columns)} FROM sensitive_data_logs {where}"
+
+
+def rebuild_confusion(cursor, threshold):
+    # Recomputes the running counters from scratch (new table, or the threshold changed)
+    cursor.execute(confusion_counts_sql(), {"threshold": threshold})
+    counts = cursor.fetchone()
+    for model in PREDICTION_MODELS:
+        cursor.execute("INSERT OR REPLACE INTO model_confusion (model, threshold, tp, fp, tn, fn) VALUES (?, ?, ?, ?, ?, ?)",
+                       (model, threshold, *(counts[f"{model}_{cell}"] for cell in CONFUSION_CELLS)))
+
+
+def metrics_from_counts(tp, fp, tn, fn):
+    # Same definitions as sklearn's accuracy/precision/recall/f1 with zero_division=0
+    total = tp + fp + tn + fn
+    return {
+        "accuracy": (tp + tn) / total if total else 0.0,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "f1_score": 2 * tp / (2 * tp + fp + fn) if tp else 0.0,
+    }
@@ -0,0 +1,125 @@
+"""
+   Registry of the models the detection pipeline uses, so loading them doesn't hold up app startup.
+   Running this file converts the fine-tuned directories to safetensors for MODEL_MMAP:
+
+       python model_registry.py ./bert_finetuned ./finbert_finetuned ./zero_shot_finetuned
+   """
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ModelRegistry:
+    """
+       Loads models by name with one of three policies:
+       - "eager": start() loads everything in parallel threads and returns once all are ready
+       - "background": start() returns immediately; the models load in parallel while the app serves
+       - "lazy": nothing loads until get() first asks for it
+       get() blocks until the model is ready (loading it in the caller's thread if nobody has started it),
+       status() reports each model's state for the /health endpoint.
+       """
+
+    def __init__(self, mode="eager", max_workers=4):
+        if mode not in ("eager", "background", "lazy"):
+            raise ValueError(f"Unknown model loading mode {mode!r}, expected eager, background or lazy")
+        self.mode = mode
+        self.max_workers = max_workers
+        self._loaders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def register(self, name, loader):
+        # loader() builds the model; it runs at most once per process
+        self._loaders[name] = loader
+        self._entries[name] = {"state": "pending", "model": None, "error": None, "seconds": None,
+                               "done": threading.Event()}
+
+    def start(self):
+        if self.mode == "lazy":
+            return
+        names = [name for name, entry in self._entries.items() if entry["state"] == "pending"]
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-loader")
+        futures = [executor.submit(self._load, name) for name in names]
+        executor.shutdown(wait=False)
+        if self.mode == "eager":
+            for future in futures:
+                future.result()
+            failed = {name: entry["error"] for name, entry in self._entries.items() if entry["state"] == "failed"}
+            if failed:
+                raise RuntimeError(f"Failed to load models: {failed}")
+
+    def _check_fork(self):
+        # Loader threads don't survive fork(): anything still loading in the parent starts over in the child
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                for entry in self._entries.values():
+                    if entry["state"] == "loading":
+                        entry.update(state="pending", done=threading.Event())
+                self._pid = os.getpid()
+
+    def _load(self, name):
+        entry = self._entries[name]
+        with self._lock:
+            if entry["state"] != "pending":
+                return
+            entry["state"] = "loading"
+        started = time.perf_counter()
+        try:
+            entry["model"] = self._loaders[name]()
+            entry["state"] = "ready"
+        except Exception as e:
+            print(f"Error loading model {name}:", str(e))
+            entry["error"] = str(e)
+            entry["state"] = "failed"
+        entry["seconds"] = round(time.perf_counter() - started, 2)
+        entry["done"].set()
+
+    def get(self, name, timeout=None):
+        self._check_fork()
+        entry = self._entries[name]
+        if entry["state"] == "pending":
+            self._load(name)
+        if not entry["done"].wait(timeout):
+            raise TimeoutError(f"Model {name} is still loading")
+        if entry["state"] == "failed":
+            raise RuntimeError(f"Model {name} failed to load: {entry['error']}")
+        return entry["model"]
+
+    def caller(self, name):
+        # A stand-in for the model that resolves it on first call, e.g. for a MicroBatcher built at import time
+        def call(*args, **kwargs):
+            return self.get(name)(*args, **kwargs)
+        return call
+
+    def ready(self):
+        # In lazy mode a model that hasn't been asked for yet doesn't make the app unready
+        accepted = ("ready", "pending") if self.mode == "lazy" else ("ready",)
+        return all(entry["state"] in accepted for entry in self._entries.values())
+
+    def status(self):
+        return {name: {"state": entry["state"], "load_seconds": entry["seconds"], "error": entry["error"]}
+                for name, entry in self._entries.items()}
+
+
+def convert_to_safetensors(model_dir):
+    # Rewrites a pytorch_model.bin checkpoint as model.safetensors, which can be memory-mapped when loading
+    from transformers import AutoModelForSequenceClassification
+    if os.path.exists(os.path.join(model_dir, "model.safetensors")):
+        return False
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.save_pretrained(model_dir, safe_serialization=True)
+    bin_path = os.path.join(model_dir, "pytorch_model.bin")
+    if os.path.exists(bin_path):
+        os.remove(bin_path)
+    return True
+
+
+if __name__ == "__main__":
+    for model_dir in sys.argv[1:]:
+        converted = convert_to_safetensors(model_dir)
+        print(f"{model_dir}: {'converted to safetensors' if converted else 'already uses safetensors'}")
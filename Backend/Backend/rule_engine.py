@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+
+REDACTION = "[REDACTED]"
+
+
+def validate_rule(rule):
+    # Returns an error message when a rule can't be used by the engine, None otherwise
+    if not isinstance(rule, str) or not rule.strip():
+        return "Rule must be a non-empty regular expression"
+    try:
+        # Compiled alone and inside a named group, exactly as it will be in the combined pattern
+        alone = re.compile(rule, re.IGNORECASE)
+        wrapped = re.compile(f"(?P<r0>{rule})", re.IGNORECASE)
+    except re.error as e:
+        return f"Invalid regular expression: {e}"
+    if wrapped.groups != alone.groups + 1:
+        # e.g. "secret)|(token" closes the wrapper group early and adds a group outside it
+        return "Rule must not close groups it did not open"
+    return None
+
+
+def redact_spans(text, spans):
+    # Rebuilds the text once, replacing every (start, end) span; overlapping or touching spans become one redaction
+    pieces = []
+    position = 0
+    for start, end in sorted(spans):
+        if end <= position:
+            continue
+        if start > position or not pieces:
+            pieces.append(text[position:start])
+            pieces.append(REDACTION)
+        position = max(position, end)
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+class RuleEngine:
+    """
+       Sensitive-data regex rules compiled once into a single alternation:
+       - Built-in rules plus every rule in the sensitive_rules table
+       - One finditer pass finds all matches (redact_spans rebuilds the redacted text from them)
+       - Recompiles only when the rule set changes (invalidate() or a new table fingerprint)
+       """
+
+    def __init__(self, connect, builtin_rules=(), reload_interval=5.0):
+        self.connect = connect
+        self.builtin_rules = list(builtin_rules)
+        self.reload_interval = reload_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._pattern = None
+        self._rules = []
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._stale = True
+
+    def invalidate(self):
+        # Called after /rules/add and /rules/delete so this process picks the change up immediately
+        self._stale = True
+
+    def _table_fingerprint(self):
+        # AUTOINCREMENT ids are never reused, so any add or delete changes (count, max id)
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT COUNT(*), MAX(id) FROM sensitive_rules").fetchone()
+        finally:
+            conn.close()
+        return tuple(row)
+
+    def _load_rules(self):
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT rule FROM sensitive_rules ORDER BY id").fetchall()
+        finally:
+            conn.close()
+        rules = []
+        for rule in self.builtin_rules + [row[0] for row in rows]:
+            error = validate_rule(rule)
+            if error:
+                print(f"Skipping sensitive rule {rule!r}: {error}")
+            elif rule not in rules:
+                rules.append(rule)
+        return rules
+
+    def _combine(self, rules):
+        try:
+            return self._compile(rules), rules
+        except re.error:
+            # Rules that are valid alone can still clash (e.g. duplicate group names), so drops the offenders
+            accepted = []
+            for rule in rules:
+                try:
+                    self._compile(accepted + [rule])
+                    accepted.append(rule)
+                except re.error as e:
+                    print(f"Skipping sensitive rule {rule!r}: {e}")
+            return self._compile(accepted), accepted
+
+    def _compile(self, rules):
+        if not rules:
+            return None
+        return re.compile("|".join(f"(?P<r{i}>{rule})" for i, rule in enumerate(rules)), re.IGNORECASE)
+
+    def _compiled(self):
+        now = time.monotonic()
+        if not self._stale and now - self._checked_at < self.reload_interval:
+            return self._pattern, self._rules
+        with self._lock:
+            # Other workers may have changed the table, so the fingerprint is rechecked every reload_interval
+            fingerprint = self._table_fingerprint()
+            if self._stale or fingerprint != self._fingerprint:
+                self._pattern, self._rules = self._combine(self._load_rules())
+                self._fingerprint = fingerprint
+                self.version += 1
+            self._stale = False
+            self._checked_at = now
+        return self._pattern, self._rules
+
+    def current_version(self):
+        # Reloads the rules if they changed and returns a counter that increases on every recompile
+        self._compiled()
+        return self.version
+
+    def pattern(self):
+        # The combined compiled pattern (None when there are no rules), e.g. for vectorized pandas matching
+        return self._compiled()[0]
+
+    def find(self, text):
+        # Returns (start, end, matched text, rule) for every non-overlapping match, left to right
+        pattern, rules = self._compiled()
+        if pattern is None or not text:
+            return []
+        findings = []
+        for match in pattern.finditer(text):
+            index = self._rule_index(match, rules)
+            if match.end() > match.start() and index is not None:
+                findings.append((match.start(), match.end(), match.group(), rules[index]))
+        return findings
+
+    @staticmethod
+    def _rule_index(match, rules):
+        # The wrapper group closes last, so lastgroup names it; the group scan (None when no wrapper matched)
+        # only guards against rules that slipped past validate_rule
+        name = match.lastgroup
+        if name is not None and name[:1] == "r" and name[1:].isdigit() and int(name[1:]) < len(rules):
+            return int(name[1:])
+        return next((i for i in range(len(rules)) if match.start(f"r{i}") != -1), None)
@@ -0,0 +1,245 @@
+"""
+   Offline audit of a document tree (PDF, CSV, Excel) with the app's detection pipeline, run from Backend/Backend:
+
+       python scan_corpus.py /mnt/share --output share_findings.jsonl
+       python scan_corpus.py /mnt/share --output share_findings.jsonl --format parquet --workers 32
+
+   - Files are distributed over a process pool; each worker loads spaCy and the classifiers once (lazily,
+     on its first file) and scans files with the same extraction, windowing, rules and models as /chat
+   - Text is scanned in overlapping windows, classified in batches; findings are reported with character
+     offsets into the extracted text. Tables get the column-aware scan of the app and per-column findings
+   - The JSONL report doubles as the checkpoint: rerunning the same command skips files already in it
+     (unchanged size and mtime), so an interrupted run resumes where it stopped
+   The sensitive_rules of the app's database (DB_PATH) are applied; nothing is written to sensitive_data_logs.
+   """
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+SCAN_EXTENSIONS = (".pdf", ".csv", ".xlsx", ".xls")
+
+# Set in each worker by init_worker
+core = None
+options = {}
+
+
+def init_worker(worker_options):
+    # Runs once per worker: the app is imported (already, with fork) and models load on the first file
+    global core, options
+    import app
+    core = app
+    options = worker_options
+    if options["torch_threads"]:
+        core.torch.set_num_threads(options["torch_threads"])
+    # Ctrl-C is handled by the parent, which stops the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def scan_text(path, name):
+    """
+       Streams the file's text in windows and classifies them `window_batch` at a time.
+       Returns the merged detection result (None for an empty file), findings with offsets into the
+       extracted text (deduplicated across window overlaps) and the number of windows.
+       """
+    total = None
+    findings = []
+    seen = set()
+    windows = 0
+    end = 0
+    batch = []
+
+    def classify(batch):
+        nonlocal total
+        for (window_start, _), result in zip(batch, core.classify_messages([window for _, window in batch])):
+            total = core.merge_detection_results(total, result)
+            for finding in result["findings"]:
+                start, stop = window_start + finding["start"], window_start + finding["end"]
+                if (start, stop, finding["source"]) in seen:
+                    continue
+                seen.add((start, stop, finding["source"]))
+                reported = {"start": start, "end": stop, "source": finding["source"], "label": finding["label"]}
+                if options["include_text"]:
+                    reported["text"] = finding["text"]
+                findings.append(reported)
+
+    for window, new_text in core.iter_windows(core.iter_file_pieces(path, name)):
+        # The new text of every window is the continuation of the previous one, so `end` is the window's end offset
+        end += len(new_text)
+        batch.append((end - len(window), window))
+        windows += 1
+        if len(batch) >= options["window_batch"]:
+            classify(batch)
+            batch = []
+            if options["stop_early"] and total["is_sensitive"]:
+                break
+    if batch:
+        classify(batch)
+    findings.sort(key=lambda finding: (finding["start"], finding["end"]))
+    return total, findings, windows
+
+
+def scan_path(entry):
+    # One report record for one file; errors are recorded instead of stopping the run
+    path, size, mtime = entry
+    started = time.perf_counter()
+    base, extension = os.path.splitext(os.path.basename(path))
+    # The app picks the reader by a lowercase extension
+    name = base + extension.lower()
+    record = {"path": path, "size": size, "mtime": mtime, "type": extension.lower().lstrip(".")}
+    try:
+        if core.TABULAR_SCAN and core.is_table_file(name):
+            result, _, columns = core.scan_table(path, name)
+            findings = []
+            record["columns"] = [column for column in columns if column["redaction"] != "none"]
+        else:
+            result, findings, record["windows"] = scan_text(path, name)
+        record["is_sensitive"] = bool(result and result["is_sensitive"])
+        record["finding_count"] = len(findings)
+        record["findings"] = findings[:options["max_findings"]]
+        if result:
+            record["models"] = {model: round(core.sensitive_probability(model_result), 4)
+                                for model, model_result in result["model_results"].items()}
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def walk_files(root, extensions):
+    # (path, size, mtime) of every matching file below root, in a stable order
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, int(stat.st_mtime)
+
+
+def load_checkpoint(report_path, retry_errors):
+    """
+       {path: (size, mtime)} of the files already in the report. A line cut off by an interrupted
+       run is truncated away so new records start on a clean line.
+       """
+    done = {}
+    if not os.path.exists(report_path):
+        return done
+    valid_bytes = 0
+    with open(report_path, "rb") as report:
+        for line in report:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            valid_bytes += len(line)
+            if retry_errors and "error" in record:
+                done.pop(record["path"], None)
+            else:
+                done[record["path"]] = (record["size"], record["mtime"])
+    if valid_bytes < os.path.getsize(report_path):
+        with open(report_path, "r+b") as report:
+            report.truncate(valid_bytes)
+    return done
+
+
+def write_parquet(report_path, parquet_path):
+    # One row per file (the latest record when a changed file was rescanned); nested fields are stored as JSON text
+    import pandas as pd
+    records = {}
+    with open(report_path, encoding="utf-8") as report:
+        for line in report:
+            record = json.loads(line)
+            records[record["path"]] = record
+    frame = pd.DataFrame(list(records.values()))
+    for column in ("findings", "columns", "models"):
+        if column in frame:
+            frame[column] = frame[column].map(lambda value: json.dumps(value) if isinstance(value, (list, dict)) else None)
+    frame.to_parquet(parquet_path, index=False)
+    return len(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a directory tree of PDF/CSV/Excel files for sensitive data")
+    parser.add_argument("root")
+    parser.add_argument("--output", default="scan_findings.jsonl", help="JSONL report, also used as the checkpoint")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl",
+                        help="parquet also writes <output>.parquet from the JSONL report when the scan finishes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--torch-threads", type=int, default=1, help="Intra-op threads per worker (0 leaves torch's default)")
+    parser.add_argument("--window-batch", type=int, default=32, help="Text windows classified per call")
+    parser.add_argument("--chunksize", type=int, default=4, help="Files handed to a worker at a time")
+    parser.add_argument("--max-files-per-worker", type=int, default=None,
+                        help="Restart workers after this many files (bounds memory growth, but reloads the models)")
+    parser.add_argument("--max-findings", type=int, default=50, help="Findings kept per file (all are counted)")
+    parser.add_argument("--include-text", action="store_true",
+                        help="Store the matched text in the report (off by default: the report would hold the data)")
+    parser.add_argument("--stop-early", action="store_true", help="Stop scanning a file at its first sensitive window")
+    parser.add_argument("--retry-errors", action="store_true", help="Rescan files whose previous attempt failed")
+    parser.add_argument("--extensions", nargs="+", default=list(SCAN_EXTENSIONS))
+    parser.add_argument("--start-method", choices=multiprocessing.get_all_start_methods(), default=None)
+    args = parser.parse_args()
+
+    # Models load in the workers, never in this process; spaCy must not start its own pools inside them
+    os.environ["MODEL_LOADING"] = "lazy"
+    os.environ["SPACY_PROCESSES"] = "1"
+    os.environ["STREAM_STOP_EARLY"] = "1" if args.stop_early else "0"
+    os.environ.setdefault("METRICS_ENABLED", "0")
+    import app  # Runs the database migrations once, before the workers start
+    extensions = tuple(extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+                       for extension in args.extensions)
+
+    done = load_checkpoint(args.output, args.retry_errors)
+    if done:
+        print(f"Resuming: {len(done)} files already in {args.output}")
+    pending = (entry for entry in walk_files(args.root, extensions) if done.get(entry[0]) != (entry[1], entry[2]))
+    worker_options = {"torch_threads": args.torch_threads, "window_batch": args.window_batch,
+                      "max_findings": args.max_findings, "include_text": args.include_text,
+                      "stop_early": args.stop_early}
+
+    context = multiprocessing.get_context(args.start_method)
+    scanned = sensitive = errors = 0
+    started = last_report = time.monotonic()
+    with open(args.output, "a", encoding="utf-8") as report:
+        pool = context.Pool(args.workers, initializer=init_worker, initargs=(worker_options,),
+                            maxtasksperchild=args.max_files_per_worker)
+        try:
+            for record in pool.imap_unordered(scan_path, pending, chunksize=args.chunksize):
+                report.write(json.dumps(record, separators=(",", ":")) + "\n")
+                scanned += 1
+                sensitive += record.get("is_sensitive", False)
+                errors += "error" in record
+                if time.monotonic() - last_report >= 10:
+                    report.flush()
+                    last_report = time.monotonic()
+                    print(f"{scanned} files, {sensitive} sensitive, {errors} errors, "
+                          f"{scanned / (last_report - started):.1f} files/s", flush=True)
+            pool.close()
+        except KeyboardInterrupt:
+            print("Interrupted; rerun the same command to resume", file=sys.stderr)
+            pool.terminate()
+            sys.exit(130)
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    elapsed = time.monotonic() - started
+    print(f"Done: {scanned} files in {elapsed:.0f}s ({scanned / elapsed if elapsed else 0:.1f} files/s), "
+          f"{sensitive} sensitive, {errors} errors. Report: {args.output}")
+    if args.format == "parquet":
+        parquet_path = os.path.splitext(args.output)[0] + ".parquet"
+        print(f"Wrote {write_parquet(args.output, parquet_path)} files to {parquet_path}")
+
+
+if __name__ == "__main__":
+    main()
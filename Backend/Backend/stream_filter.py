@@ -0,0 +1,47 @@
+from rule_engine import redact_spans
+
+
+class StreamRedactor:
+    """
+       Incremental output-side filter for streamed LLM responses:
+       - feed() takes each new token and returns the text that is safe to send
+       - The last `holdback` characters are kept back, since a rule match may still be growing there
+       - Text is released up to the last whitespace before that point, and never past the start of a
+         match that is still open
+       Only the regex rules run on the stream; the models and spaCy need whole sentences.
+       """
+
+    def __init__(self, find, holdback=128):
+        self.find = find
+        self.holdback = holdback
+        self.buffer = ""
+        self.redactions = 0
+
+    def _redact(self, text, findings):
+        self.redactions += len(findings)
+        return redact_spans(text, [(start, end) for start, end, _, _ in findings])
+
+    def feed(self, text):
+        self.buffer += text
+        if len(self.buffer) <= self.holdback:
+            return ""
+        findings = self.find(self.buffer)
+        cut = len(self.buffer) - self.holdback
+        # Cuts on whitespace so a value that only matches once complete (e.g. an email) isn't split
+        whitespace = max(self.buffer.rfind(" ", 0, cut), self.buffer.rfind("\n", 0, cut))
+        if whitespace > 0:
+            cut = whitespace + 1
+        for start, end, _, _ in findings:
+            if start < cut < end:
+                cut = start
+                break
+        released = [finding for finding in findings if finding[1] <= cut]
+        safe_text = self._redact(self.buffer[:cut], released)
+        self.buffer = self.buffer[cut:]
+        return safe_text
+
+    def flush(self):
+        # Releases whatever is left once the stream has ended
+        safe_text = self._redact(self.buffer, self.find(self.buffer))
+        self.buffer = ""
+        return safe_text
@@ -0,0 +1,35 @@
+"""
+   Deterministic stand-in for the fine-tuned classifiers, for load tests without model weights or a GPU:
+
+       MODEL_BACKEND=stub STUB_BATCH_MS=20 STUB_ITEM_MS=2 python app.py
+
+   Used together with fake_openai.py, a load run measures the app itself (batching, spaCy, rules,
+   caching, SQLite) with a configurable, repeatable model cost.
+   """
+import re
+import time
+
+# Messages matching this are labelled sensitive, roughly like the fine-tuned models on the training data
+STUB_SENSITIVE_PATTERN = re.compile(
+    r"\d{6,}|@|\b(?:account|card|password|pin|salary|ssn|iban|routing|passport|transfer)\b", re.IGNORECASE)
+
+
+class StubClassifier:
+    """
+       Callable like a text-classification pipeline (classifier(texts) -> [{"label", "score"}]).
+       Each call sleeps batch_ms plus item_ms per message to simulate a forward pass.
+       """
+
+    def __init__(self, name, batch_ms=0.0, item_ms=0.0):
+        self.name = name
+        self.batch_seconds = batch_ms / 1000.0
+        self.item_seconds = item_ms / 1000.0
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        if isinstance(texts, str):
+            texts = [texts]
+        delay = self.batch_seconds + self.item_seconds * len(texts)
+        if delay > 0:
+            time.sleep(delay)
+        return [{"label": "LABEL_1", "score": 0.9} if STUB_SENSITIVE_PATTERN.search(text)
+                else {"label": "LABEL_0", "score": 0.95} for text in texts]
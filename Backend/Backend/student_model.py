@@ -0,0 +1,105 @@
+import json
+import os
+
+import torch
+from safetensors.torch import load_file, save_file
+from torch import nn
+from transformers import AutoModel, AutoTokenizer
+
+from token_inference import TokenWindows
+
+# One head per teacher model, named like the prediction columns of sensitive_data_logs
+HEAD_NAMES = ("bert", "finbert", "zero_shot")
+HEADS_FILE = "heads.safetensors"
+HEADS_CONFIG = "student_heads.json"
+
+
+class MultiHeadStudent(nn.Module):
+    """
+       Small shared encoder with one linear classification head per teacher:
+       - Trained by train_models.py (distill mode) to reproduce each teacher's logits
+       - One forward pass gives all three predictions
+       - Saved as the encoder's own files plus heads.safetensors and student_heads.json
+       """
+
+    def __init__(self, encoder, head_names=HEAD_NAMES, num_labels=2, dropout=0.1):
+        super().__init__()
+        self.encoder = encoder
+        self.dropout = nn.Dropout(dropout)
+        self.heads = nn.ModuleDict({name: nn.Linear(encoder.config.hidden_size, num_labels) for name in head_names})
+
+    @classmethod
+    def from_base(cls, base_model, head_names=HEAD_NAMES):
+        # Fresh heads on top of a pretrained encoder, as the starting point for distillation
+        return cls(AutoModel.from_pretrained(base_model), head_names)
+
+    @classmethod
+    def from_pretrained(cls, path):
+        with open(os.path.join(path, HEADS_CONFIG), encoding="utf-8") as config:
+            head_names = json.load(config)["heads"]
+        model = cls(AutoModel.from_pretrained(path), head_names)
+        model.heads.load_state_dict(load_file(os.path.join(path, HEADS_FILE)))
+        return model.eval()
+
+    def save_pretrained(self, path):
+        self.encoder.save_pretrained(path)
+        save_file({key: value.contiguous() for key, value in self.heads.state_dict().items()},
+                  os.path.join(path, HEADS_FILE))
+        with open(os.path.join(path, HEADS_CONFIG), "w", encoding="utf-8") as config:
+            json.dump({"heads": list(self.heads)}, config)
+
+    def forward(self, input_ids, attention_mask):
+        # Returns {head name: logits}, all computed from the [CLS] representation of one encoder pass
+        hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state[:, 0]
+        hidden = self.dropout(hidden)
+        return {name: head(hidden) for name, head in self.heads.items()}
+
+
+class StudentClassifier:
+    """
+       Pipeline-style wrapper so the student can sit behind a MicroBatcher:
+       classifier(texts) returns, per text, {head name: {"label": "LABEL_x", "score": p}}.
+       With token_aware, long texts are run as overlapping max_length-token windows (the length the
+       student was distilled at) and each head keeps its most sensitive window, as TokenAwareClassifier does.
+       """
+
+    def __init__(self, path, max_length=128, token_aware=False, stride=64, max_batch_tokens=8192):
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.model = MultiHeadStudent.from_pretrained(path)
+        self.max_length = max_length
+        self.windowing = TokenWindows(self.tokenizer, max_length, stride, max_batch_tokens) if token_aware else None
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        if isinstance(texts, str):
+            texts = [texts]
+        if self.windowing is not None:
+            return self._call_windowed(texts)
+        encoded = self.tokenizer(texts, padding=True, truncation=truncation, max_length=self.max_length,
+                                 return_tensors="pt")
+        with torch.inference_mode():
+            logits = self.model(encoded["input_ids"], encoded["attention_mask"])
+        results = [{} for _ in texts]
+        for name, head_logits in logits.items():
+            scores, labels = head_logits.softmax(-1).max(-1)
+            for result, score, label in zip(results, scores.tolist(), labels.tolist()):
+                result[name] = {"label": f"LABEL_{label}", "score": score}
+        return results
+
+    def _call_windowed(self, texts):
+        # Max-pooling over windows per head: keep the window with the highest LABEL_1 probability
+        best = [{} for _ in texts]
+        for text_indices, input_ids, attention_mask in self.windowing.batches(texts):
+            with torch.inference_mode():
+                logits = self.model(input_ids, attention_mask)
+            for name, head_logits in logits.items():
+                for text_index, row in zip(text_indices, head_logits.softmax(-1).tolist()):
+                    if name not in best[text_index] or row[1] > best[text_index][name][1]:
+                        best[text_index][name] = row
+        results = []
+        for rows in best:
+            result = {}
+            for name, row in rows.items():
+                label = max(range(len(row)), key=row.__getitem__)
+                result[name] = {"label": f"LABEL_{label}", "score": row[label]}
+            results.append(result)
+        return results
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import torch
+
+# Tokenizers with identical vocabularies and settings share one SharedTokenizer (and its cache)
+_shared_tokenizers = {}
+_shared_lock = threading.Lock()
+
+
+def tokenizer_fingerprint(tokenizer):
+    # Same class, casing and vocabulary means the same token ids for any text
+    vocab = sorted(tokenizer.get_vocab().items())
+    settings = [type(tokenizer).__name__, getattr(tokenizer, "do_lower_case", None)]
+    return hashlib.sha1(json.dumps([settings, vocab]).encode("utf-8")).hexdigest()
+
+
+class SharedTokenizer:
+    """
+       Tokenizes each message once for every model that uses the same vocabulary:
+       ids (without special tokens) are kept in a small LRU keyed by text, so when the BERT and
+       FinBERT batchers see the same message only the first one pays for tokenization.
+       """
+
+    def __init__(self, tokenizer, max_entries=4096):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        ids = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for index, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is None:
+                    missing.append(index)
+                else:
+                    self._cache.move_to_end(text)
+                    ids[index] = cached
+        if missing:
+            encoded = self.tokenizer([texts[index] for index in missing], add_special_tokens=False,
+                                     return_attention_mask=False, verbose=False)["input_ids"]
+            with self._lock:
+                for index, token_ids in zip(missing, encoded):
+                    ids[index] = token_ids
+                    self._cache[texts[index]] = token_ids
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return ids
+
+
+def shared_tokenizer(tokenizer):
+    fingerprint = tokenizer_fingerprint(tokenizer)
+    with _shared_lock:
+        if fingerprint not in _shared_tokenizers:
+            _shared_tokenizers[fingerprint] = SharedTokenizer(tokenizer)
+        return _shared_tokenizers[fingerprint]
+
+
+class TokenWindows:
+    """
+       Turns a batch of messages into model inputs without truncating any of them:
+       - Messages longer than the model's window are split into overlapping token windows
+       - The windows are sorted by length and run in buckets, so short messages aren't padded
+         to the longest one and no forward pass exceeds max_batch_tokens
+       """
+
+    def __init__(self, tokenizer, max_length=512, stride=64, max_batch_tokens=8192):
+        self.tokenizer = shared_tokenizer(tokenizer)
+        self.max_length = min(max_length, tokenizer.model_max_length)
+        self.window = self.max_length - tokenizer.num_special_tokens_to_add()
+        self.stride = min(stride, self.window // 2)
+        self.max_batch_tokens = max_batch_tokens
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+
+    def windows(self, token_ids):
+        # Overlapping windows of at most self.window tokens, each wrapped in the model's special tokens
+        build = self.tokenizer.tokenizer.build_inputs_with_special_tokens
+        if len(token_ids) <= self.window:
+            return [build(token_ids)]
+        step = self.window - self.stride
+        starts = range(0, max(len(token_ids) - self.stride, 1), step)
+        return [build(token_ids[start:start + self.window]) for start in starts]
+
+    def buckets(self, rows):
+        # Consecutive runs of the length-sorted rows whose padded size stays within max_batch_tokens
+        bucket = []
+        for row in rows:
+            if bucket and (len(bucket) + 1) * len(row[1]) > self.max_batch_tokens:
+                yield bucket
+                bucket = []
+            bucket.append(row)
+        if bucket:
+            yield bucket
+
+    def pad(self, windows):
+        # Right-pads one bucket to its longest window (the windows are sorted, so that's the last one)
+        length = len(windows[-1])
+        input_ids = torch.full((len(windows), length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(windows), length), dtype=torch.long)
+        for row, window in enumerate(windows):
+            input_ids[row, :len(window)] = torch.tensor(window, dtype=torch.long)
+            attention_mask[row, :len(window)] = 1
+        return input_ids, attention_mask
+
+    def batches(self, texts):
+        # Yields (text index of each window, input_ids, attention_mask) for every bucket of the texts' windows
+        rows = []
+        for text_index, token_ids in enumerate(self.tokenizer.encode(texts)):
+            rows.extend((text_index, window) for window in self.windows(token_ids))
+        rows.sort(key=lambda row: len(row[1]))
+        for bucket in self.buckets(rows):
+            input_ids, attention_mask = self.pad([window for _, window in bucket])
+            yield [text_index for text_index, _ in bucket], input_ids, attention_mask
+
+
+class TokenAwareClassifier(TokenWindows):
+    """
+       Drop-in replacement for a text-classification pipeline call (classifier(texts) -> [{"label", "score"}]):
+       messages are run as the windows of TokenWindows, and the window most likely to be sensitive decides
+       the message's result. Works with any model returning .logits (PyTorch or ONNX Runtime).
+       """
+
+    def __init__(self, model, tokenizer, max_length=512, stride=64, max_batch_tokens=8192, sensitive_labels=None):
+        super().__init__(tokenizer, max_length, stride, max_batch_tokens)
+        self.model = model
+        self.id2label = model.config.id2label
+        sensitive_labels = sensitive_labels or ("LABEL_1", "sensitive")
+        matching = [index for index, label in self.id2label.items() if label in sensitive_labels]
+        self.sensitive_index = matching[0] if matching else 1
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        # batch_size and truncation are accepted for pipeline compatibility; long texts are windowed, not cut
+        if isinstance(texts, str):
+            texts = [texts]
+        best = [None] * len(texts)
+        for text_indices, input_ids, attention_mask in self.batches(texts):
+            with torch.inference_mode():
+                probabilities = self.model(input_ids=input_ids, attention_mask=attention_mask).logits.softmax(-1)
+            for text_index, row in zip(text_indices, probabilities.tolist()):
+                # Max-pooling over windows: keep the window with the highest sensitive probability
+                if best[text_index] is None or row[self.sensitive_index] > best[text_index][self.sensitive_index]:
+                    best[text_index] = row
+
+        results = []
+        for row in best:
+            label_index = max(range(len(row)), key=row.__getitem__)
+            results.append({"label": self.id2label[label_index], "score": row[label_index]})
+        return results
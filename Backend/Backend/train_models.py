@@ -1,6 +1,11 @@
 import os
+import random
+import re
+import sys
 import numpy as np
 import pandas as pd
+import torch
+import torch.nn.functional as F
 
 # Hugging Face Transformers imports for tokenization, modeling, and training
 from transformers import (
@@ -14,6 +19,8 @@ from transformers import (
 )
 from datasets import Dataset
 
+from student_model import MultiHeadStudent
+
 # Scikit-learn metrics for evaluation
 from sklearn.metrics import (
     accuracy_score,
@@ -582,9 +589,137 @@ def fine_tune_zero_shot():
     tokenizer.save_pretrained("./zero_shot_finetuned")
     print("Zero-shot fine-tuning completed.")
 
+# Teachers distilled into the student, keyed by the student head (and sensitive_data_logs column) they feed
+TEACHER_DIRS = {"bert": "./bert_finetuned", "finbert": "./finbert_finetuned", "zero_shot": "./zero_shot_finetuned"}
+STUDENT_BASE = "google/bert_uncased_L-4_H-512_A-8"
+STUDENT_DIR = "./student_distilled"
+
+def augment_texts(data, copies=3, seed=42):
+    """
+       Label-preserving variations of the training examples, so the student sees more of the
+       teachers' behaviour than the few hundred originals: digits replaced by random digits,
+       changed casing, different separators and a dropped filler word.
+       """
+    rng = random.Random(seed)
+    augmented = []
+    for example in data:
+        for _ in range(copies):
+            text = re.sub(r"\d", lambda _: str(rng.randint(0, 9)), example["text"])
+            choice = rng.random()
+            if choice < 0.25:
+                text = text.lower()
+            elif choice < 0.5:
+                text = text.upper()
+            elif choice < 0.75:
+                text = text.replace(":", rng.choice([" -", " =", " is"]))
+            else:
+                words = text.split()
+                fillers = [i for i, word in enumerate(words) if word.lower() in ("the", "a", "is", "to", "for", "of")]
+                if fillers:
+                    del words[rng.choice(fillers)]
+                text = " ".join(words)
+            augmented.append({"text": text, "label": example["label"]})
+    return augmented
+
+def teacher_logits(model_dir, texts, batch_size=32):
+    # Logits of one fine-tuned teacher for every text, computed with its own tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    logits = []
+    with torch.no_grad():
+        for start in range(0, len(texts), batch_size):
+            encoded = tokenizer(texts[start:start + batch_size], padding=True, truncation=True, max_length=128,
+                                return_tensors="pt")
+            logits.append(model(**encoded).logits)
+    return torch.cat(logits)
+
+def distill_student(epochs=8, batch_size=32, temperature=2.0, alpha=0.7, learning_rate=5e-5):
+    """
+       Trains one small encoder with a head per fine-tuned model (see student_model.py).
+       Each head minimises a mix of the KL divergence to its teacher's softened logits (weight alpha)
+       and cross-entropy on the true label. Results per head are appended to training_results.csv.
+       The held-out 20% is split from the original examples first, so none of its oversampled copies or
+       augmented variants end up in training.
+       """
+    originals = list(training_data)
+    rng = random.Random(42)
+    rng.shuffle(originals)
+    held_out = originals[int(len(originals) * 0.8):]
+    train = originals[:int(len(originals) * 0.8)]
+    train = balance_dataset(train) + augment_texts(train)
+    rng.shuffle(train)
+    # Rows [0, split) are trained on, the rest are evaluated
+    examples = train + held_out
+    split = len(train)
+    texts = [example["text"] for example in examples]
+    labels = torch.tensor([int(example["label"]) for example in examples])
+    targets = {name: teacher_logits(model_dir, texts) for name, model_dir in TEACHER_DIRS.items()}
+
+    tokenizer = AutoTokenizer.from_pretrained(STUDENT_BASE)
+    student = MultiHeadStudent.from_base(STUDENT_BASE, head_names=list(TEACHER_DIRS))
+    optimizer = torch.optim.AdamW(student.parameters(), lr=learning_rate, weight_decay=0.01)
+    encoded = tokenizer(texts, padding=True, truncation=True, max_length=128, return_tensors="pt")
+
+    for epoch in range(1, epochs + 1):
+        student.train()
+        order = torch.randperm(split)
+        for start in range(0, split, batch_size):
+            batch = order[start:start + batch_size]
+            outputs = student(encoded["input_ids"][batch], encoded["attention_mask"][batch])
+            loss = 0
+            for name, logits in outputs.items():
+                soft_targets = F.softmax(targets[name][batch] / temperature, dim=-1)
+                distillation = F.kl_div(F.log_softmax(logits / temperature, dim=-1), soft_targets,
+                                        reduction="batchmean") * temperature ** 2
+                loss = loss + alpha * distillation + (1 - alpha) * F.cross_entropy(logits, labels[batch])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+        evaluate_student(student, encoded, labels, targets, split, epoch)
+
+    student.save_pretrained(STUDENT_DIR)
+    tokenizer.save_pretrained(STUDENT_DIR)
+    print(f"Student distillation completed, saved to {STUDENT_DIR}.")
+
+def evaluate_student(student, encoded, labels, targets, split, epoch):
+    # Held-out metrics per head, plus how often the head agrees with its teacher
+    student.eval()
+    with torch.no_grad():
+        outputs = student(encoded["input_ids"][split:], encoded["attention_mask"][split:])
+    results = []
+    for name, logits in outputs.items():
+        preds = logits.argmax(-1).numpy()
+        y_true = labels[split:].numpy()
+        precision, recall, f1, _ = precision_recall_fscore_support(y_true, preds, average="binary", zero_division=0)
+        tn, fp, fn, tp = confusion_matrix(y_true, preds, labels=[0, 1]).ravel()
+        results.append({
+            "model": f"Student ({name})",
+            "epoch": float(epoch),
+            "eval_accuracy": accuracy_score(y_true, preds),
+            "eval_f1": f1,
+            "eval_precision": precision,
+            "eval_recall": recall,
+            "true_negatives": tn,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "true_positives": tp,
+            "teacher_agreement": float((logits.argmax(-1) == targets[name][split:].argmax(-1)).float().mean()),
+        })
+    df = pd.DataFrame(results)
+    print(f"\nStudent Epoch {epoch} Results:")
+    print(df.to_markdown(index=False))
+    # teacher_agreement is only printed, so the CSV keeps the same columns as the fine-tuning rows
+    df.drop(columns="teacher_agreement").to_csv("training_results.csv", mode='a',
+                                                header=not os.path.exists("training_results.csv"), index=False)
+
 if __name__ == "__main__":
-    if os.path.exists("training_results.csv"):
-        os.remove("training_results.csv")
-    fine_tune_bert()
-    fine_tune_finbert()
-    fine_tune_zero_shot()
\ No newline at end of file
+    # "finetune" (default) trains the three classifiers; "distill" then trains the multi-head student from them
+    mode = sys.argv[1] if len(sys.argv) > 1 else "finetune"
+    if mode == "distill":
+        distill_student()
+    else:
+        if os.path.exists("training_results.csv"):
+            os.remove("training_results.csv")
+        fine_tune_bert()
+        fine_tune_finbert()
+        fine_tune_zero_shot()
\ No newline at end of file
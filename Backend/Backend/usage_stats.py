@@ -0,0 +1,68 @@
+import threading
+import time
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests land in le_inf
+LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500)
+BUCKET_COLUMNS = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+
+
+def rollup_table_sql():
+    buckets = ",\n".join(f"                        {column} INTEGER DEFAULT 0" for column in BUCKET_COLUMNS)
+    return f'''CREATE TABLE IF NOT EXISTS api_usage_rollup (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        minute TEXT, endpoint TEXT,
+                        request_count INTEGER DEFAULT 0, total_ms REAL DEFAULT 0, max_ms REAL DEFAULT 0,
+{buckets},
+                        UNIQUE(minute, endpoint))'''
+
+
+def rollup_upsert_sql():
+    columns = ["minute", "endpoint", "request_count", "total_ms", "max_ms"] + BUCKET_COLUMNS
+    additive = ["request_count", "total_ms"] + BUCKET_COLUMNS
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in additive)
+    return (f"INSERT INTO api_usage_rollup ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT(minute, endpoint) DO UPDATE SET {updates}, max_ms = MAX(max_ms, excluded.max_ms)")
+
+
+class EndpointUsageAggregator:
+    """
+       In-process endpoint usage counters, bucketed by minute:
+       - record() updates a dict under a lock; no database access on the request path
+       - Every flush_interval seconds the accumulated minutes are handed to `write` as
+         upserts into api_usage_rollup (request count, total/max latency and a latency histogram)
+       """
+
+    def __init__(self, write, flush_interval=10.0):
+        self.write = write
+        self.flush_interval = flush_interval
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._upsert_sql = rollup_upsert_sql()
+
+    def record(self, endpoint, duration_ms, when=None):
+        minute = time.strftime("%Y-%m-%d %H:%M", time.gmtime(when))
+        bucket = len(LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                bucket = index
+                break
+        with self._lock:
+            counters = self._counters.get((minute, endpoint))
+            if counters is None:
+                counters = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * len(BUCKET_COLUMNS)}
+                self._counters[(minute, endpoint)] = counters
+            counters["count"] += 1
+            counters["total_ms"] += duration_ms
+            counters["max_ms"] = max(counters["max_ms"], duration_ms)
+            counters["buckets"][bucket] += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            self._last_flush = time.monotonic()
+        for (minute, endpoint), values in counters.items():
+            self.write(self._upsert_sql, (minute, endpoint, values["count"], values["total_ms"], values["max_ms"],
+                                          *values["buckets"]))
@@ -2,6 +2,8 @@ import React, { useState, useEffect, useRef } from "react";
 import axios from "axios"; 
 import "./ChatInterface.css"; 
 
+const HISTORY_PAGE_SIZE = 50;
+
 export default function ChatInterface() {
   const [message, setMessage] = useState(""); 
   const [messages, setMessages] = useState([]); 
@@ -9,7 +11,10 @@ export default function ChatInterface() {
   const [role, setRole] = useState(null); 
   const [userId, setUserId] = useState(null); 
   const [isLoading, setIsLoading] = useState(false); 
+  const [oldestId, setOldestId] = useState(null); // id of the oldest history row shown, the cursor for older pages
+  const [hasMoreHistory, setHasMoreHistory] = useState(false); // Whether an older page may exist
   const chatBoxRef = useRef(null); 
+  const previousHeightRef = useRef(null); // Chat box height before older history was added above
 
   useEffect(() => {
     const userRole = localStorage.getItem("role");
@@ -30,21 +35,37 @@ export default function ChatInterface() {
   }, [userId]); 
 
   useEffect(() => {
-    if (chatBoxRef.current) {
-      chatBoxRef.current.scrollTop = chatBoxRef.current.scrollHeight;
+    const chatBox = chatBoxRef.current;
+    if (!chatBox) return;
+    if (previousHeightRef.current !== null) {
+      // Older history was added above: keep the same messages in view
+      chatBox.scrollTop += chatBox.scrollHeight - previousHeightRef.current;
+      previousHeightRef.current = null;
+    } else {
+      chatBox.scrollTop = chatBox.scrollHeight;
     }
   }, [messages]); 
 
-  const fetchChatHistory = async (userId) => {
+  // Fetches the newest page of history, or the page older than beforeId
+  const fetchChatHistory = async (userId, beforeId = null) => {
     try {
-      const res = await axios.post("http://127.0.0.1:5000/history", { user_id: userId }, { withCredentials: true });
-      res.data.reverse();
+      const params = { user_id: userId, limit: HISTORY_PAGE_SIZE };
+      if (beforeId !== null) params.before_id = beforeId;
+      const res = await axios.post("http://127.0.0.1:5000/history", params, { withCredentials: true });
+      const rows = res.data; // Newest first
       const chatHistory = [];
-      res.data.forEach(chat => {
+      [...rows].reverse().forEach(chat => {
         chatHistory.push({ role: "user", content: chat.question });
         chatHistory.push({ role: "assistant", content: chat.response });
       });
-      setMessages(chatHistory);
+      if (beforeId === null) {
+        setMessages(chatHistory);
+      } else {
+        previousHeightRef.current = chatBoxRef.current ? chatBoxRef.current.scrollHeight : null;
+        setMessages((prev) => [...chatHistory, ...prev]);
+      }
+      if (rows.length) setOldestId(rows[rows.length - 1].id);
+      setHasMoreHistory(rows.length === HISTORY_PAGE_SIZE);
     } catch (error) {
       console.error("Error fetching chat history:", error);
     }
@@ -54,6 +75,32 @@ export default function ChatInterface() {
     setFile(e.target.files[0]);
   };
 
+  // Applies one server-sent event from /chat/stream to the assistant message being streamed
+  const handleStreamEvent = (rawEvent) => {
+    let eventType = "message";
+    let data = "";
+    rawEvent.split("\n").forEach((line) => {
+      if (line.startsWith("event:")) eventType = line.slice(6).trim();
+      else if (line.startsWith("data:")) data += line.slice(5).trim();
+    });
+    if (!data) return;
+    const payload = JSON.parse(data);
+
+    setMessages((prev) => {
+      const updated = [...prev];
+      const last = updated[updated.length - 1];
+      if (eventType === "done") {
+        // An empty final response keeps what is already shown (e.g. an error message)
+        updated[updated.length - 1] = { ...last, content: payload.response || last.content };
+      } else if (eventType === "error") {
+        updated[updated.length - 1] = { ...last, content: last.content || payload.error };
+      } else if (payload.delta) {
+        updated[updated.length - 1] = { ...last, content: last.content + payload.delta };
+      }
+      return updated;
+    });
+  };
+
   const sendMessage = async () => {
     if (!message && !file) return;
 
@@ -66,19 +113,36 @@ export default function ChatInterface() {
       formData.append("file", file);
     }
 
-    try {
-      const res = await axios.post("http://127.0.0.1:5000/chat", formData, { withCredentials: true });
+    // Shows the user's message right away and an empty assistant message that fills in as tokens arrive
+    setMessages((prev) => [...prev, { role: "user", content: message || file.name }, { role: "assistant", content: "" }]);
+    setMessage("");
+    setFile(null);
 
-      // Update messages with user's message
-      const newMessages = [...messages, { role: "user", content: message || file.name }];
-      // Add assistant's response
-      newMessages.push({ role: "assistant", content: res.data.response });
+    try {
+      const res = await fetch("http://127.0.0.1:5000/chat/stream", {
+        method: "POST",
+        body: formData,
+        credentials: "include",
+      });
+      if (!res.ok || !res.body) {
+        throw new Error(`Request failed with status ${res.status}`);
+      }
 
-      setMessages(newMessages);
-      setMessage("");
-      setFile(null);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        // Events are separated by a blank line; the last piece may still be incomplete
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        events.forEach(handleStreamEvent);
+      }
     } catch (error) {
       console.error("Error sending message:", error);
+      setMessages((prev) => prev.slice(0, -2));
     } finally {
       setIsLoading(false);
     }
@@ -98,12 +162,21 @@ export default function ChatInterface() {
           </button>
         </div>
         <div className="chat-box" ref={chatBoxRef}>
+          {hasMoreHistory && (
+            <button className="load-more" onClick={() => fetchChatHistory(userId, oldestId)}>
+              Load earlier messages
+            </button>
+          )}
           {messages.map((msg, index) => (
-            <div key={index} className={`chat-message ${msg.role}`}>
-              {msg.content}
-            </div>
+            msg.content && (
+              <div key={index} className={`chat-message ${msg.role}`}>
+                {msg.content}
+              </div>
+            )
           ))}
-          {isLoading && <div className="chat-message assistant">Waiting For Response...</div>}
+          {isLoading && !messages[messages.length - 1]?.content && (
+            <div className="chat-message assistant">Waiting For Response...</div>
+          )}
         </div>
         <div className="chat-input">
           <input
@@ -3,8 +3,11 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import "./Logs.css";
 
+const PAGE_SIZE = 25;
+
 export default function Logs() {
   const [logs, setLogs] = useState([]);
+  const [hasMore, setHasMore] = useState(false);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -19,10 +22,16 @@ export default function Logs() {
     fetchLogs();
   }, [navigate]);
 
-  const fetchLogs = async () => {
+  // Fetches one page of usage rows; with a cursor, the older page is appended
+  const fetchLogs = async (beforeId) => {
     try {
-      const res = await axios.get("http://127.0.0.1:5000/logs");
-      setLogs(res.data);
+      const params = { limit: PAGE_SIZE };
+      if (beforeId) {
+        params.before_id = beforeId;
+      }
+      const res = await axios.get("http://127.0.0.1:5000/logs", { params });
+      setLogs((previous) => (beforeId ? [...previous, ...res.data] : res.data));
+      setHasMore(res.data.length === PAGE_SIZE);
     } catch (error) {
       console.error("Error fetching logs:", error);
     }
@@ -34,8 +43,11 @@ export default function Logs() {
       <table>
         <thead>
           <tr>
-            <th>Timestamp</th>
+            <th>Minute</th>
             <th>Endpoint</th>
+            <th>Requests</th>
+            <th>Avg Latency (ms)</th>
+            <th>Max Latency (ms)</th>
           </tr>
         </thead>
         <tbody>
@@ -43,10 +55,18 @@ export default function Logs() {
             <tr key={log.id}>
               <td>{new Date(log.timestamp).toLocaleString()}</td>
               <td>{log.endpoint}</td>
+              <td>{log.request_count}</td>
+              <td>{log.avg_ms.toFixed(1)}</td>
+              <td>{log.max_ms.toFixed(1)}</td>
             </tr>
           ))}
         </tbody>
       </table>
+      {hasMore && (
+        <button className="load-more" onClick={() => fetchLogs(logs[logs.length - 1].id)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -3,8 +3,11 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios"; 
 import "./Queries.css"; 
 
+const PAGE_SIZE = 20;
+
 export default function Queries() {
   const [queries, setQueries] = useState([]); // State to store the list of queries fetched from the server
+  const [hasMore, setHasMore] = useState(false); // Whether an older page may exist
   const navigate = useNavigate(); // Hook to navigate programmatically based on certain conditions
 
   // useEffect hook to verify if the user is an Admin and fetch queries
@@ -17,18 +20,56 @@ export default function Queries() {
       return;
     }
 
-    fetchQueries(); // If the user is admin, fetch queries data
-    const interval = setInterval(fetchQueries, 10000); // Fetch queries every 10 seconds
-    return () => clearInterval(interval); // Clear the interval when the component is unmounted
+    // If the user is admin, fetch the newest queries once, then let the server push new ones as they arrive
+    let source = null;
+    let closed = false;
+    fetchQueries().then((newestId) => {
+      if (closed) {
+        return;
+      }
+      const cursor = newestId === null ? "" : `?after_id=${newestId}`;
+      source = new EventSource(`http://127.0.0.1:5000/queries/stream${cursor}`);
+      source.onmessage = (event) => addNewQueries(JSON.parse(event.data));
+    });
+    return () => {
+      // Close the stream when the component is unmounted
+      closed = true;
+      if (source) {
+        source.close();
+      }
+    };
   }, [navigate]); 
 
-  // Function to fetch queries from the server
+  // Function to fetch the newest page of queries; returns the newest id (null if the request failed)
   const fetchQueries = async () => {
     try {
-      const res = await axios.get("http://127.0.0.1:5000/queries"); // Fetch queries from backend
-      setQueries(res.data); // Set the fetched queries into the state
+      const res = await axios.get("http://127.0.0.1:5000/queries", { params: { limit: PAGE_SIZE } });
+      setQueries(res.data);
+      setHasMore(res.data.length === PAGE_SIZE);
+      return res.data.length ? res.data[0].id : 0;
     } catch (error) {
       console.error("Error fetching queries:", error); // Handle any errors that occur while fetching data
+      return null;
+    }
+  };
+
+  // Function to prepend queries pushed by the server (they arrive oldest first), skipping any already shown
+  const addNewQueries = (rows) => {
+    setQueries((previous) => {
+      const newestId = previous.length ? previous[0].id : 0;
+      return [...rows.filter((query) => query.id > newestId).reverse(), ...previous];
+    });
+  };
+
+  // Function to append the page older than the last query shown
+  const fetchOlderQueries = async () => {
+    try {
+      const beforeId = queries[queries.length - 1].id;
+      const res = await axios.get("http://127.0.0.1:5000/queries", { params: { limit: PAGE_SIZE, before_id: beforeId } });
+      setQueries((previous) => [...previous, ...res.data.filter((query) => query.id < beforeId)]);
+      setHasMore(res.data.length === PAGE_SIZE);
+    } catch (error) {
+      console.error("Error fetching queries:", error);
     }
   };
 
@@ -45,8 +86,8 @@ export default function Queries() {
           </tr>
         </thead>
         <tbody>
-          {queries.map((query, index) => (
-            <tr key={index}>
+          {queries.map((query) => (
+            <tr key={query.id}>
               <td>{new Date(query.timestamp).toLocaleString()}</td>
               <td>{query.question}</td>
               <td>{query.response}</td>
@@ -54,6 +95,11 @@ export default function Queries() {
           ))}
         </tbody>
       </table>
+      {hasMore && (
+        <button className="load-more" onClick={fetchOlderQueries}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -44,6 +44,9 @@ export default function Rules() {
       fetchRules(); // 
     } catch (error) {
       console.error("Error adding rule:", error); // Handle any errors that occur during the request
+      if (error.response && error.response.data.error) {
+        alert(error.response.data.error); // Invalid or duplicate regex rejected by the backend
+      }
     }
   };
 
@@ -2,11 +2,14 @@ import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import './SensitiveLogs.css'; 
 
+const PAGE_SIZE = 50;
+
 const SensitiveLogs = () => {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [role, setRole] = useState(localStorage.getItem('role'));
+  const [hasMore, setHasMore] = useState(false);
 
   useEffect(() => {
     if (role !== 'Admin') {
@@ -15,20 +18,52 @@ const SensitiveLogs = () => {
       return;
     }
 
-    const fetchLogs = async () => {
-      try {
-        const response = await axios.get('http://127.0.0.1:5000/sensitive_logs');
-        setLogs(response.data);
-        setLoading(false);
-      } catch (err) {
-        setError('Failed to fetch sensitive data logs.');
-        setLoading(false);
+    // Loads the newest page once; after that new logs are pushed by the server
+    let source = null;
+    let closed = false;
+    fetchLogs().then((newestId) => {
+      if (closed || newestId === null) {
+        return;
+      }
+      source = new EventSource(`http://127.0.0.1:5000/sensitive_logs/stream?after_id=${newestId}`);
+      source.onmessage = (event) => addNewLogs(JSON.parse(event.data));
+    });
+    return () => {
+      closed = true;
+      if (source) {
+        source.close();
       }
     };
-
-    fetchLogs();
   }, [role]);
 
+  // Prepends logs pushed by the server (they arrive oldest first), skipping any already shown
+  const addNewLogs = (rows) => {
+    setLogs((previous) => {
+      const newestId = previous.length ? previous[0].id : 0;
+      return [...rows.filter((log) => log.id > newestId).reverse(), ...previous];
+    });
+  };
+
+  // Fetches one page of logs; with a cursor, the page older than the last row already shown is appended.
+  // Returns the newest id of a first page (null if the request failed)
+  const fetchLogs = async (beforeId) => {
+    try {
+      const params = { limit: PAGE_SIZE };
+      if (beforeId) {
+        params.before_id = beforeId;
+      }
+      const response = await axios.get('http://127.0.0.1:5000/sensitive_logs', { params });
+      setLogs((previous) => (beforeId ? [...previous, ...response.data] : response.data));
+      setHasMore(response.data.length === PAGE_SIZE);
+      setLoading(false);
+      return response.data.length ? response.data[0].id : 0;
+    } catch (err) {
+      setError('Failed to fetch sensitive data logs.');
+      setLoading(false);
+      return null;
+    }
+  };
+
   if (loading) {
     return <div className="loading">Loading...</div>;
   }
@@ -51,6 +86,7 @@ const SensitiveLogs = () => {
             <th>FinBERT Prediction</th>
             <th>Zero-shot Prediction</th>
             <th>Is Sensitive</th>
+            <th>Skipped Stages</th>
             <th>Timestamp</th>
           </tr>
         </thead>
@@ -68,11 +104,17 @@ const SensitiveLogs = () => {
               <td>{log.finbert_prediction}</td>
               <td>{log.zero_shot_prediction}</td>
               <td>{log.is_sensitive ? 'Yes' : 'No'}</td>
+              <td>{log.skipped_stages || '-'}</td>
               <td>{log.timestamp}</td>
             </tr>
           ))}
         </tbody>
       </table>
+      {hasMore && (
+        <button className="load-more" onClick={() => fetchLogs(logs[logs.length - 1].id)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 };